@@ -0,0 +1,61 @@
+#! /usr/bin/env python3
+
+import sys
+import os
+import os.path
+import time
+import random
+import sqlite3
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from logviewer.sqlite3_driver import SQLite3Driver
+from sqlite3_bench import create_database
+
+# the connection the driver used to open
+class PlainDriver(SQLite3Driver):
+    def start_connection(self):
+        self._connection = sqlite3.connect(self._filename)
+
+# drops the file from the OS page cache, so the next reads go to the disk
+def evict(filename):
+    fd = os.open(filename, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    finally:
+        os.close(fd)
+
+def jump_and_scroll(driver, starts, count):
+    times = []
+    for start in starts:
+        t = time.perf_counter()
+        query = driver.prepare_query(start, True, count)
+        driver.fetch_batch(query, count)
+        times.append(time.perf_counter() - t)
+    return sorted(times)
+
+def bench_scroll(filename, rows, count):
+    print('refills of {} rows at random positions, {} rows'.format(count, rows))
+    starts = random.Random(1).sample(range(count, rows), 200)
+    for name, driver_class in [('plain', PlainDriver), ('tuned', SQLite3Driver)]:
+        evict(filename)
+        driver = driver_class(filename)
+        driver.start_connection()
+        try:
+            for state in ['cold', 'warm']:
+                times = jump_and_scroll(driver, starts, count)
+                driver._streams.clear()
+                print('  {} {} {:8.3f} ms mean {:8.3f} ms median {:8.3f} ms '\
+                    'max'.format(name, state, sum(times) * 1e3 / len(times),
+                    times[len(times) // 2] * 1e3, times[-1] * 1e3))
+        finally:
+            driver.stop_connection()
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) >= 2 else 1000000
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filename = os.path.join(temp_dir, 'bench.db')
+        create_database(filename, rows)
+        bench_scroll(filename, rows, 250)
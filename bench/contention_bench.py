@@ -0,0 +1,80 @@
+#! /usr/bin/env python3
+
+import sys
+import os.path
+import time
+import datetime
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from logviewer.screen_buffer import ScreenBuffer
+
+DATETIME = datetime.datetime(2016, 5, 22, 23, 0, 0)
+
+class TimedLock(object):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waits = dict()
+
+    def __enter__(self):
+        t = time.perf_counter()
+        if not self._lock.acquire(False):
+            self._lock.acquire()
+            name = threading.current_thread().name
+            self.waits[name] = self.waits.get(name, 0.0) + time.perf_counter() - t
+
+    def __exit__(self, *args):
+        self._lock.release()
+
+def make_record(i):
+    return ScreenBuffer.make_record(i, i % 24, i % 8, 'host{}'.format(i % 200),
+        DATETIME, 'program{}'.format(i % 20), '100', 'message number {}'.format(i))
+
+# stands in for a driver that never waits on the database: one record per
+# insert, so the writer takes the buffer lock as often as it possibly can
+def write(buf, stop):
+    i = 0
+    while not stop.is_set():
+        buf.append_record(make_record(i))
+        i += 1
+    return i
+
+def read_locked(buf):
+    with buf._lock:
+        return buf.get_current_lines()
+
+def read_snapshot(buf):
+    return buf.get_current_lines()
+
+def bench_reader(name, read, page_size, duration):
+    buf = ScreenBuffer(page_size=page_size, max_lines=page_size * 50)
+    buf._lock = lock = TimedLock()
+    stop, written = threading.Event(), []
+    writer = threading.Thread(target=lambda: written.append(write(buf, stop)),
+        name='writer')
+    writer.start()
+
+    waits = []
+    t_end = time.perf_counter() + duration
+    while time.perf_counter() < t_end:
+        t = time.perf_counter()
+        read(buf)
+        waits.append(time.perf_counter() - t)
+    stop.set()
+    writer.join()
+
+    waits.sort()
+    pct = lambda p: waits[min(int(len(waits) * p), len(waits) - 1)] * 1e3
+    print('  {:<16} {:7d} reads {:7.3f} ms p50 {:7.3f} ms p99 {:8d} records,'
+        ' lock wait: reader {:7.1f} ms writer {:7.1f} ms'.format(name,
+        len(waits), pct(0.5), pct(0.99), written[0],
+        lock.waits.get('MainThread', 0.0) * 1e3,
+        lock.waits.get('writer', 0.0) * 1e3))
+
+if __name__ == '__main__':
+    print('get_current_lines against a writer appending one record at a time'
+        ' for 3 s')
+    for name, read in [('locked read', read_locked),
+            ('snapshot read', read_snapshot)]:
+        bench_reader(name, read, 200, 3.0)
@@ -0,0 +1,48 @@
+#! /usr/bin/env python3
+
+import sys
+import os.path
+import time
+import datetime
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from logviewer.sqlite3_driver import SQLite3Driver
+from sqlite3_bench import create_database
+
+# the datetime query SQLDriver used to send before seek_start_date bisected
+# the id range; the bench database keeps text datetimes
+def seek_by_datetime(driver):
+    rows = driver._read_all("SELECT {} FROM logs WHERE datetime >= ? ORDER "\
+        "BY datetime ASC LIMIT 1".format(driver._get_columns()),
+        (driver._start_date.strftime('%Y-%m-%d %H:%M:%S'), ), 1)
+    return rows[0][0] if rows else None
+
+def seek_by_id(driver):
+    return driver.seek_start_date()
+
+def bench_seek(filename, count):
+    print('seek to start date, {} rows'.format(count))
+    start = datetime.datetime(2016, 1, 1)
+    for name, func in [('datetime scan', seek_by_datetime),
+            ('id bisection', seek_by_id)]:
+        for offset in [count // 10, count // 2, count - 10]:
+            driver = SQLite3Driver(filename,
+                start_date=start + datetime.timedelta(seconds=offset))
+            driver.start_connection()
+            try:
+                t = time.perf_counter()
+                id = func(driver)
+                t = time.perf_counter() - t
+            finally:
+                driver.stop_connection()
+            print('  {:14s} row {:9d} -> id {:9d} {:10.3f} ms'.format(name,
+                offset, id, t * 1e3))
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) >= 2 else 1000000
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filename = os.path.join(temp_dir, 'bench.db')
+        create_database(filename, count)
+        bench_seek(filename, count)
@@ -0,0 +1,74 @@
+#! /usr/bin/env python3
+
+import sys
+import os.path
+import datetime
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from logviewer.screen_buffer import ScreenBuffer
+
+DT = datetime.datetime(2016, 5, 22, 23, 0, 0)
+
+# the line representation used before ScreenBuffer kept raw records: one
+# Line with an instance dict per physical line, built from a copy of the
+# record dict and holding its own host/program strings
+class DictLine(object):
+    def __init__(self, data, is_continuation):
+        self._id = data['id']
+        self._datetime = data['datetime']
+        self._host = data['host']
+        self._program = data['program']
+        self._facility = ScreenBuffer.Line.FACILITIES[int(data['facility_num'])]
+        self._level = ScreenBuffer.Line.LEVELS[int(data['level_num'])]
+        self._message = data['message']
+        self._is_continuation = is_continuation
+
+def make_rows(count):
+    for i in range(count):
+        # build new strings for every row, as database drivers do
+        yield (i, i % 24, i % 8, 'host-{:03}'.format(i % 200), DT,
+            'program-{:02}'.format(i % 20), '100',
+            'message number {}'.format(i))
+
+def make_records(count):
+    for row in make_rows(count):
+        yield ScreenBuffer.make_record(*row)
+
+def build_dict_lines(count):
+    result = []
+    for row in make_rows(count):
+        rec = { 'id': row[0], 'facility_num': str(row[1]),
+            'level_num': str(row[2]), 'host': row[3], 'datetime': row[4],
+            'program': row[5], 'pid': row[6], 'message': row[7] }
+        for i, msg in enumerate(rec['message'].split('\n')):
+            tmp = rec.copy()
+            tmp['message'] = msg
+            result.append(DictLine(tmp, i > 0))
+    return result
+
+def build_screen_buffer(count):
+    buf = ScreenBuffer(page_size=50)
+    buf.append_records(make_records(count))
+    return buf
+
+def measure(name, func, count):
+    tracemalloc.start()
+    result = func(count)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print('  {:<28} {:8.1f} bytes/line'.format(name, size / count))
+    return result
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) >= 2 else 1000000
+    print('memory per buffered line, {} lines'.format(count))
+    measure('dict lines (before)', build_dict_lines, count)
+    measure('record batches (after)', build_screen_buffer, count)
+    rec = next(make_records(1))
+    before, after = DictLine(rec._asdict(), False), ScreenBuffer.Line(rec, False)
+    print('  Line object (before)         {:8} bytes'.format(
+        sys.getsizeof(before) + sys.getsizeof(before.__dict__)))
+    print('  Line object (after)          {:8} bytes'.format(
+        sys.getsizeof(after)))
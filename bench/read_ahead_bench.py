@@ -0,0 +1,65 @@
+#! /usr/bin/env python3
+
+import sys
+import os.path
+import time
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from logviewer.screen_buffer import ScreenBuffer
+
+DATETIME = datetime.datetime(2016, 5, 22, 23, 0, 0)
+
+# answers every query after a fixed delay, like a remote database would
+class SlowDriver(ScreenBuffer.Driver):
+    def __init__(self, last, latency):
+        self._last = last
+        self._latency = latency
+
+    def has_start_date(self):
+        return False
+
+    def prepare_query(self, start, desc, count):
+        time.sleep(self._latency)
+        if desc:
+            ids = range(start - 1 if start else self._last, 0, -1)
+        else:
+            ids = range(start + 1, self._last + 1)
+        return iter(ids[:count])
+
+    def fetch_record(self, query):
+        i = next(query, None)
+        if not i is None:
+            return ScreenBuffer.make_record(i, 1, 6, 'host', DATETIME,
+                'program', '100', 'message number {}'.format(i))
+
+def wait_for_lines(buf, count):
+    while buf.footprint[0] < count:
+        time.sleep(0.001)
+
+# holds PgUp at the keyboard's repeat rate and counts the key presses that
+# end up on the top edge of the buffer while older records still exist
+def bench_page_up(name, clock, page_size, latency, presses, rate):
+    buf = ScreenBuffer(page_size=page_size, clock=clock)
+    buf.start(SlowDriver(10000000, latency))
+    wait_for_lines(buf, page_size)
+
+    stalls = 0
+    for i in range(presses):
+        buf.go_to_previous_page()
+        time.sleep(1.0 / rate)
+        if buf._position == 0:
+            stalls += 1
+    buf.stop()
+    print('  {:<24} {:4d} of {} key presses hit the top of the buffer'.format(
+        name, stalls, presses))
+
+if __name__ == '__main__':
+    page_size, latency, presses, rate = 50, 0.2, 150, 30
+    print('PgUp held at {} Hz, {}-line pages, {:.0f} ms per query'.format(
+        rate, page_size, latency * 1e3))
+    bench_page_up('fixed read-ahead', lambda: 0.0, page_size, latency,
+        presses, rate)
+    bench_page_up('adaptive read-ahead', time.monotonic, page_size, latency,
+        presses, rate)
@@ -0,0 +1,95 @@
+#! /usr/bin/env python3
+
+import sys
+import os.path
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from logviewer.base_manager import BaseManager
+from logviewer.screen_buffer import ScreenBuffer
+from logviewer.windows import Log, Text
+
+# counts the characters handed to curses, as a proxy for the terminal output
+# produced by each loop iteration
+class CountingWindow(object):
+    def __init__(self, counter, h, w, keys=None):
+        self._counter = counter
+        self._h, self._w = h, w
+        self._keys = keys
+
+    def getmaxyx(self):
+        return self._h, self._w
+
+    def getch(self):
+        return self._keys.pop(0) if self._keys else -1
+
+    def addnstr(self, y, x, val, n, *args):
+        self._counter[0] += min(len(val), n)
+
+    def addstr(self, y, x, val, *args):
+        self._counter[0] += len(val)
+
+    def subwin(self, h, w, y, x):
+        return CountingWindow(self._counter, h, w)
+
+    def border(self):
+        self._counter[0] += 2 * (self._h + self._w)
+
+    def erase(self):
+        self._counter[0] += self._h * self._w
+
+    def __getattr__(self, name):
+        return lambda *args: None
+
+class CountingCurses(object):
+    A_REVERSE = 0x100
+    A_BOLD = 0x200
+    KEY_MIN = 0x101
+
+    def __init__(self, counter):
+        self._counter = counter
+
+    def newpad(self, h, w):
+        return CountingWindow(self._counter, h, w)
+
+    def color_pair(self, i):
+        return i
+
+    def __getattr__(self, name):
+        return lambda *args: None
+
+class Manager(BaseManager):
+    def wait(self, timeout=None):
+        pass
+
+def bench_keystrokes(height, keys, full_redraw):
+    counter = [0]
+    keys_left = list()
+    root = CountingWindow(counter, height, 200, keys_left)
+    manager = Manager(CountingCurses(counter), root)
+
+    buf = ScreenBuffer(page_size=height - 1)
+    dt = datetime.datetime(2016, 5, 22, 23, 0, 0)
+    buf.append_records(ScreenBuffer.make_record(i, i % 24, i % 8,
+        'host{}'.format(i % 200), dt, 'program{}'.format(i % 20), '100',
+        'message number {}'.format(i)) for i in range(height * 5))
+
+    manager.stack.append(Log(manager, buf, 500))
+    manager.stack.append(Text(manager, 'Program', 70))
+    manager.loop()
+
+    counter[0] = 0
+    for i in range(keys):
+        keys_left.append(ord('a'))
+        if full_redraw:
+            manager._drawn_stack = None
+        manager.loop()
+    manager.loop()
+    return counter[0] / keys
+
+if __name__ == '__main__':
+    print('characters drawn per keystroke in a modal over a 200-row log')
+    for name, full_redraw in [('full redraw', True), ('damage tracked', False)]:
+        print('  {:<16} {:10.0f}'.format(name,
+            bench_keystrokes(200, 100, full_redraw)))
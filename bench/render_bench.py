@@ -0,0 +1,74 @@
+#! /usr/bin/env python3
+
+import sys
+import os.path
+import time
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from logviewer.screen_buffer import ScreenBuffer
+from logviewer.windows import Log
+
+class NullWindow(object):
+    def __init__(self, h, w):
+        self._h, self._w = h, w
+
+    def getmaxyx(self):
+        return self._h, self._w
+
+    def addnstr(self, *args):
+        pass
+
+    def chgat(self, *args):
+        pass
+
+    def erase(self):
+        pass
+
+    def noutrefresh(self, *args):
+        pass
+
+    def resize(self, *args):
+        pass
+
+class NullCurses(object):
+    A_REVERSE = 0x100
+    A_BOLD = 0x200
+
+    def __init__(self, h, w):
+        self._h, self._w = h, w
+
+    def newpad(self, h, w):
+        return NullWindow(h, w)
+
+    def color_pair(self, i):
+        return i
+
+class NullManager(object):
+    def __init__(self, h, w):
+        self.curses = NullCurses(h, w)
+        self.curses_window = NullWindow(h, w)
+
+def bench_refresh(height, frames):
+    manager = NullManager(height, 200)
+    buf = ScreenBuffer(page_size=height - 1)
+    dt = datetime.datetime(2016, 5, 22, 23, 0, 0)
+    buf.append_records(ScreenBuffer.make_record(i, i % 24, i % 8,
+        'host{}'.format(i % 200), dt, 'program{}'.format(i % 20), '100',
+        'message number {}'.format(i)) for i in range(height * 5))
+    win = Log(manager, buf, 500)
+
+    print('Log.refresh on a {}-row terminal'.format(height))
+    for name, cached in [('uncached prefixes', False),
+            ('cached prefixes', True)]:
+        t = time.perf_counter()
+        for i in range(frames):
+            if not cached:
+                win._prefix_cache = dict()
+            win.refresh()
+        elapsed = time.perf_counter() - t
+        print('  {:<20} {:8.3f} ms/frame'.format(name, elapsed * 1e3 / frames))
+
+if __name__ == '__main__':
+    bench_refresh(200, 500)
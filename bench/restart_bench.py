@@ -0,0 +1,67 @@
+#! /usr/bin/env python3
+
+import sys
+import os.path
+import time
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from logviewer.screen_buffer import ScreenBuffer
+from logviewer.sqlite3_driver import SQLite3Driver
+from sqlite3_bench import create_database
+
+# a local file connects almost for free; a network database pays a handshake
+# (TCP, authentication) per connection, which is simulated here
+class RemoteDriver(SQLite3Driver):
+    HANDSHAKE = 0.02
+
+    def start_connection(self):
+        time.sleep(RemoteDriver.HANDSHAKE)
+        SQLite3Driver.start_connection(self)
+
+class FirstRows(object):
+    def __init__(self, buf):
+        self._buf = buf
+        self._event = threading.Event()
+
+    def notify(self):
+        if self._buf.get_current_lines():
+            self._event.set()
+
+    def wait(self):
+        self._event.wait()
+        self._event.clear()
+
+def restart_by_stop_and_start(buf, driver):
+    buf.stop()
+    buf.start(driver)
+
+def bench_restart(filename, driver_class, changes):
+    print('time to first row after a filter change, {}'.format(
+        driver_class.__name__))
+    for name, restart in [('stop and start', restart_by_stop_and_start),
+            ('restart', ScreenBuffer.restart)]:
+        buf = ScreenBuffer(page_size=50)
+        first_rows = FirstRows(buf)
+        buf.add_observer(first_rows.notify)
+        buf.start(driver_class(filename))
+        first_rows.wait()
+
+        elapsed = 0.0
+        for i in range(changes):
+            t = time.perf_counter()
+            restart(buf, driver_class(filename, level=7 - i % 2))
+            first_rows.wait()
+            elapsed += time.perf_counter() - t
+        buf.stop()
+        print('  {:<24} {:8.3f} ms'.format(name, elapsed * 1e3 / changes))
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) >= 2 else 100000
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filename = os.path.join(temp_dir, 'bench.db')
+        create_database(filename, count)
+        bench_restart(filename, SQLite3Driver, 200)
+        bench_restart(filename, RemoteDriver, 50)
@@ -0,0 +1,76 @@
+#! /usr/bin/env python3
+
+import sys
+import os.path
+import time
+import sqlite3
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from logviewer.sqlite3_driver import SQLite3Driver
+from sqlite3_bench import create_database
+
+# times every statement, the longest one being how long the worker can't
+# report anything
+class TimingDriver(SQLite3Driver):
+    def __init__(self, filename, **kwargs):
+        SQLite3Driver.__init__(self, filename, **kwargs)
+        self.times = []
+
+    def _read_all(self, cmd, params, limit):
+        t = time.perf_counter()
+        try:
+            return SQLite3Driver._read_all(self, cmd, params, limit)
+        finally:
+            self.times.append(time.perf_counter() - t)
+
+def mark_rare(filename, count, every):
+    conn = sqlite3.connect(filename)
+    conn.execute("UPDATE logs SET program = 'rare' WHERE id % ? = 0", (every, ))
+    conn.commit()
+    conn.close()
+
+def create_index(filename):
+    conn = sqlite3.connect(filename)
+    conn.execute('CREATE INDEX logs_program ON logs (program)')
+    conn.commit()
+    conn.close()
+
+def fetch_page(driver, count):
+    query = driver.prepare_query(None, True, count)
+    n, batches = 0, 0
+    while n < count:
+        batch = driver.fetch_batch(query, count - n)
+        n, batches = n + len(batch), batches + 1
+        if driver.get_scan_progress(query) is None:
+            return n, batches
+    return n, batches
+
+def bench_scan(filename, count, every):
+    print('page of 50 rows matching 1 in {} of {} rows'.format(every, count))
+    for windows in [False, True]:
+        driver = TimingDriver(filename, program='rare')
+        driver.SCAN_WINDOWS = windows
+        driver.start_connection()
+        try:
+            t = time.perf_counter()
+            n, batches = fetch_page(driver, 50)
+            t = time.perf_counter() - t
+        finally:
+            driver.stop_connection()
+        print('  {:12s} {:4d} rows {:8.3f} ms total {:8.3f} ms longest '\
+            'statement, {} updates'.format('windows' if windows else 'one query',
+            n, t * 1e3, max(driver.times) * 1e3, batches))
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) >= 2 else 1000000
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filename = os.path.join(temp_dir, 'bench.db')
+        create_database(filename, count)
+        mark_rare(filename, count, count // 100)
+        bench_scan(filename, count, count // 100)
+        # with an index on the filter the driver keeps the single query
+        create_index(filename)
+        print('with an index on program')
+        bench_scan(filename, count, count // 100)
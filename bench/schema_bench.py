@@ -0,0 +1,64 @@
+#! /usr/bin/env python3
+
+import sys
+import os.path
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from logviewer.sqlite3_driver import SQLite3Driver
+from logviewer.sqlite3_indexer import SQLite3Indexer
+from logviewer.sqlite3_schema import migrate_to_v2
+from sqlite3_bench import create_database
+
+FILTERS = [
+    ('no filter', {}),
+    ('host=host17', { 'host': 'host17' }),
+    ('host=host17*', { 'host': 'host17*' }),
+    ('program=program7', { 'program': 'program7' }),
+    ('host=!host1*', { 'host': '!host1*' }),
+]
+
+# time to fill the first screen and scroll back a few pages
+def fill_pages(filename, filter, count, pages):
+    driver = SQLite3Driver(filename, **filter)
+    driver.start_connection()
+    try:
+        t, start = time.perf_counter(), None
+        for i in range(pages):
+            query = driver.prepare_query(start, True, count)
+            n = 0
+            while n < count:
+                batch = driver.fetch_batch(query, count - n)
+                n += len(batch)
+                if len(batch) > 0:
+                    start = batch.get_id(len(batch) - 1)
+                if driver.get_scan_progress(query) is None:
+                    break
+        return time.perf_counter() - t
+    finally:
+        driver.stop_connection()
+
+def bench_schemas(filenames):
+    for name, filename in filenames:
+        print('  {} {:10.1f} MiB'.format(name, os.path.getsize(filename) / 2 ** 20))
+    for name, filename in filenames:
+        SQLite3Indexer(filename).create_indexes()
+        print('  {} {:10.1f} MiB with indexes'.format(name,
+            os.path.getsize(filename) / 2 ** 20))
+    print('first {} pages of 50 rows'.format(10))
+    for desc, filter in FILTERS:
+        for name, filename in filenames:
+            t = fill_pages(filename, filter, 50, 10)
+            print('  {:20s} {} {:8.3f} ms'.format(desc, name, t * 1e3))
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) >= 2 else 1000000
+    with tempfile.TemporaryDirectory() as temp_dir:
+        v1 = os.path.join(temp_dir, 'v1.db')
+        v2 = os.path.join(temp_dir, 'v2.db')
+        create_database(v1, count)
+        migrate_to_v2(v1, v2)
+        print('file size, {} rows'.format(count))
+        bench_schemas([('v1', v1), ('v2', v2)])
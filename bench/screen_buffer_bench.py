@@ -0,0 +1,52 @@
+#! /usr/bin/env python3
+
+import sys
+import os.path
+import time
+import gc
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from logviewer.screen_buffer import ScreenBuffer
+
+DT = datetime.datetime(2016, 5, 22, 23, 0, 0)
+
+def make_record(i):
+    return ScreenBuffer.make_record(i, i % 24, i % 8, 'host{}'.format(i % 200),
+        DT, 'program{}'.format(i % 20), '100', 'message {}'.format(i))
+
+def bench_scroll_up(sizes, batch):
+    print('scroll-up (prepend) cost per record, batches of {}'.format(batch))
+    for size in sizes:
+        buf = ScreenBuffer(page_size=50)
+        start = size + batch
+        for i in range(start, batch, -1):
+            buf.prepend_record(make_record(i))
+        records = [make_record(i) for i in range(batch, 0, -1)]
+        gc.collect()
+        gc.disable()
+        t = time.perf_counter()
+        for rec in records:
+            buf.prepend_record(rec)
+        elapsed = time.perf_counter() - t
+        gc.enable()
+        print('  {:>9} lines: {:8.2f} us/record'.format(size,
+            elapsed * 1e6 / batch))
+
+def bench_prefetch(page_size, pages, rounds):
+    print('prefetch of {} pages of {} lines in the fetch thread'.format(pages,
+        page_size))
+    buf = ScreenBuffer(page_size=page_size)
+    count = page_size * pages
+    batches = [[make_record(i) for i in range(j * count, (j + 1) * count)]
+        for j in range(rounds)]
+    t = time.perf_counter()
+    for recs in batches:
+        buf.append_records(recs)
+    elapsed = time.perf_counter() - t
+    print('  {:8.2f} us/record'.format(elapsed * 1e6 / (count * rounds)))
+
+if __name__ == '__main__':
+    bench_prefetch(50, 5, 200)
+    bench_scroll_up([1000, 10000, 100000, 1000000], 5000)
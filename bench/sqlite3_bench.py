@@ -0,0 +1,87 @@
+#! /usr/bin/env python3
+
+import sys
+import os.path
+import time
+import sqlite3
+import tempfile
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from logviewer.screen_buffer import ScreenBuffer
+from logviewer.sqlite3_driver import SQLite3Driver
+
+# the legacy parse of text timestamps
+class StrptimeDriver(SQLite3Driver):
+    def _parse_timestamp(self, value):
+        return ScreenBuffer.RecordBatch.to_timestamp(
+            datetime.datetime.strptime(value, '%Y-%m-%d %H:%M:%S'))
+
+def create_database(filename, count, epoch=False):
+    conn = sqlite3.connect(filename)
+    conn.execute('CREATE TABLE logs (id INTEGER PRIMARY KEY AUTOINCREMENT, '\
+        'facility_num INTEGER, level_num INTEGER, host TEXT, datetime {}, '\
+        'program TEXT, pid TEXT, message TEXT)'.format(
+        'INTEGER' if epoch else 'TEXT'))
+    start = datetime.datetime(2016, 1, 1)
+    if epoch:
+        date = lambda i: 1451606400 + i
+    else:
+        date = lambda i: (start + datetime.timedelta(seconds=i)).strftime(
+            '%Y-%m-%d %H:%M:%S')
+    conn.executemany('INSERT INTO logs (facility_num, level_num, host, '\
+        'datetime, program, pid, message) VALUES (?, ?, ?, ?, ?, ?, ?)',
+        ((i % 24, i % 8, 'host{}'.format(i % 200), date(i),
+            'program{}'.format(i % 20), str(i % 30000),
+            'message number {}'.format(i)) for i in range(count)))
+    conn.commit()
+    conn.close()
+
+def fetch_one_by_one(driver, query, count):
+    n = 0
+    while driver.fetch_record(query):
+        n += 1
+    return n
+
+def fetch_in_batches(driver, query, count):
+    n = 0
+    while True:
+        recs = driver.fetch_records(query, 256)
+        n += len(recs)
+        if len(recs) < 256:
+            return n
+
+def fetch_columnar(driver, query, count):
+    n = 0
+    while True:
+        batch = driver.fetch_batch(query, 256)
+        n += len(batch)
+        if len(batch) < 256:
+            return n
+
+def bench_fetch(filename, count, driver_class=SQLite3Driver, title=''):
+    print('fetch rate, {} rows{}'.format(count, title))
+    for name, func in [('fetch_record', fetch_one_by_one),
+            ('fetch_records', fetch_in_batches),
+            ('fetch_batch', fetch_columnar)]:
+        driver = driver_class(filename)
+        driver.start_connection()
+        try:
+            t = time.perf_counter()
+            n = func(driver, driver.prepare_query(None, True, count), count)
+            elapsed = time.perf_counter() - t
+        finally:
+            driver.stop_connection()
+        print('  {:<24} {:10.0f} rows/s'.format(name, n / elapsed))
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) >= 2 else 1000000
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filename = os.path.join(temp_dir, 'bench.db')
+        create_database(filename, count)
+        bench_fetch(filename, count, StrptimeDriver, ', text with strptime')
+        bench_fetch(filename, count, SQLite3Driver, ', text')
+        filename = os.path.join(temp_dir, 'epoch.db')
+        create_database(filename, count, epoch=True)
+        bench_fetch(filename, count, SQLite3Driver, ', epoch')
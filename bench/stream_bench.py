@@ -0,0 +1,55 @@
+#! /usr/bin/env python3
+
+import sys
+import os.path
+import time
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from logviewer.sqlite3_driver import SQLite3Driver
+from sqlite3_bench import create_database
+
+# a database across the network pays a round trip per query
+class RemoteDriver(SQLite3Driver):
+    ROUND_TRIP = 0.005
+
+    def select(self, cmd, params=()):
+        time.sleep(RemoteDriver.ROUND_TRIP)
+        return SQLite3Driver.select(self, cmd, params)
+
+# scrolls back through the whole table the way the buffer refills it: each
+# query continues from the oldest id the previous one returned
+def scroll_back(driver, count):
+    start, times = None, []
+    while True:
+        t = time.perf_counter()
+        query = driver.prepare_query(start, True, count)
+        batch = driver.fetch_batch(query, count)
+        times.append(time.perf_counter() - t)
+        if len(batch) < count:
+            return sorted(times)
+        start = batch.get_id(len(batch) - 1)
+
+def bench_scroll(filename, driver_class, program, count):
+    print('refills of {} rows scrolling back, {}, program={}'.format(count,
+        driver_class.__name__, program))
+    for factor in [1, 4, 16]:
+        driver = driver_class(filename, program=program)
+        driver.STREAM_FACTOR = factor
+        driver.start_connection()
+        try:
+            times = scroll_back(driver, count)
+        finally:
+            driver.stop_connection()
+        print('  {:2d} refills per query {:8.3f} ms mean {:8.3f} ms median'.format(
+            factor, sum(times) * 1e3 / len(times), times[len(times) // 2] * 1e3))
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) >= 2 else 200000
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filename = os.path.join(temp_dir, 'bench.db')
+        create_database(filename, count)
+        for driver_class in [SQLite3Driver, RemoteDriver]:
+            bench_scroll(filename, driver_class, None, 250)
+            bench_scroll(filename, driver_class, 'program7', 250)
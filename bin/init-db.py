@@ -1,9 +1,13 @@
 #! /usr/bin/python
 
 import sys
+import time
 import datetime
 import random
 
+# with --epoch the datetime column holds Unix timestamps instead of text
+epoch = '--epoch' in sys.argv[1:]
+
 sys.stdout.write('''BEGIN;
 ''')
 
@@ -12,20 +16,23 @@ sys.stdout.write('''CREATE TABLE logs (
   facility_num INTEGER,
   level_num INTEGER,
   host TEXT,
-  datetime TEXT,
+  datetime {},
   program TEXT,
   pid TEXT,
   message TEXT);
-''')
+'''.format('INTEGER' if epoch else 'TEXT'))
 
 now = datetime.datetime.now() - datetime.timedelta(hours=1)
 inc = datetime.timedelta(seconds=13)
 
 for i in range(200):
-    dt = datetime.datetime.strftime(now, '%Y-%m-%d %H:%M:%S')
+    if epoch:
+        dt = int(time.mktime(now.timetuple()))
+    else:
+        dt = "'{}'".format(datetime.datetime.strftime(now, '%Y-%m-%d %H:%M:%S'))
     now += inc
     sys.stdout.write('''INSERT INTO logs (facility_num, level_num, host,
-datetime, program, pid, message) VALUES ('{}', '{}', 'oasis', '{}', 'test', '100',
+datetime, program, pid, message) VALUES ('{}', '{}', 'oasis', {}, 'test', '100',
 'line {}/1
 line {}/2');
 '''.format(random.randint(0, 23), random.randint(0, 7), dt, i + 1, i + 1))
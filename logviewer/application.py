@@ -4,6 +4,7 @@ import select
 import curses
 import datetime
 import struct
+import threading
 
 from .base_manager import BaseManager
 from .screen_buffer import ScreenBuffer
@@ -17,42 +18,63 @@ class EventPoll(object):
         self._poll.register(sys.stdin.fileno(), select.POLLIN)
         self._poll.register(self._r, select.POLLIN)
 
+        self._lock = threading.Lock()
+        self._pending = False
+        self._merged = 0
+
+    # notifications coalesce: while one is pending, later ones do not touch the
+    # pipe, since a single wake-up redraws everything that changed
     def _notify(self):
+        with self._lock:
+            if self._pending:
+                self._merged += 1
+                return
+            self._pending = True
         os.write(self._w, b'0')
 
     @property
     def observer(self):
         return self._notify
 
-    def wait(self):
-        while True:
-            try:
-                result_poll = self._poll.poll()
-                if result_poll:
-                    if result_poll[0][0] == self._r:
-                        os.read(self._r, 256)
-                    break
-            except InterruptedError:
-                break
+    @property
+    def merged(self):
+        with self._lock:
+            return self._merged
+
+    # the timeout is in seconds, as given by the render scheduler; epoll
+    # takes seconds, unlike select.poll, which would take milliseconds
+    def wait(self, timeout=None):
+        try:
+            result_poll = self._poll.poll(-1 if timeout is None else timeout)
+        except InterruptedError:
+            return 0
+        for fd, event in result_poll:
+            if fd == self._r:
+                os.read(self._r, 256)
+                with self._lock:
+                    self._pending = False
+                return 1
+        return 0
 
 class Manager(BaseManager):
-    def __init__(self, curses, curses_window):
-        BaseManager.__init__(self, curses, curses_window)
+    def __init__(self, curses, curses_window, max_fps=None):
+        BaseManager.__init__(self, curses, curses_window, max_fps)
         self._poll = EventPoll()
 
     @property
     def poll(self):
         return self._poll
 
-    def wait(self):
-        return self._poll.wait()
+    def wait(self, timeout=None):
+        return self._poll.wait(timeout)
 
 class MainWindow(windows.Log):
     def __init__(self, window_manager, configuration):
         curses_window = window_manager.curses_window
         h, w = curses_window.getmaxyx()
 
-        self._buf = ScreenBuffer(page_size=h - 1, timeout=configuration.timeout)
+        self._buf = ScreenBuffer(page_size=h - 1, timeout=configuration.timeout,
+            max_lines=configuration.max_lines, max_bytes=configuration.max_bytes)
         self._buf.add_observer(window_manager.poll.observer)
 
         windows.Log.__init__(self, window_manager, self._buf, 500)
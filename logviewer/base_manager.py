@@ -1,7 +1,9 @@
 import curses
 
+from .render_scheduler import RenderScheduler
+
 class BaseManager(object):
-    def __init__(self, curses, curses_window):
+    def __init__(self, curses, curses_window, max_fps=None):
         curses.start_color()
 
         curses.curs_set(0)
@@ -18,24 +20,64 @@ class BaseManager(object):
         self._curses_window = curses_window
 
         self._stack = list()
+        self._drawn_stack = None
+        self._scheduler = RenderScheduler(max_fps)
 
-    def loop(self):
-        self._curses_window.erase()
-        self._curses_window.noutrefresh()
+    def _get_first_dirty(self):
+        if self._stack != self._drawn_stack:
+            return 0
+        for i, window in enumerate(self._stack):
+            if window.dirty:
+                return i
+
+    def redraw(self):
+        # a window draws over everything below it, so redraw from the lowest
+        # dirty window up; the root window is only erased on full redraws
+        first = self._get_first_dirty()
+        if first is None:
+            return False
 
-        for window in self._stack:
+        if first == 0:
+            self._curses_window.erase()
+            self._curses_window.noutrefresh()
+
+        for window in self._stack[first:]:
             window.refresh()
+            window.mark_clean()
+        self._drawn_stack = list(self._stack)
 
         self._curses.doupdate()
+        return True
+
+    def _render(self):
+        # frames are rate limited: while the next frame is not due, keys are
+        # still handled right away but drawing waits for the frame slot, so
+        # everything that happened in between is merged into one frame
+        if self._get_first_dirty() is None:
+            return None
+        delay = self._scheduler.get_delay()
+        if delay > 0:
+            self._scheduler.frame_deferred()
+            return delay
+        self.redraw()
+        self._scheduler.frame_rendered()
+        return None
 
-        self.wait()
+    def loop(self):
+        timeout = self._render()
+
+        self._scheduler.add_events(self.wait(timeout) or 0)
         for k in self._get_chars():
+            self._scheduler.add_events(1)
             if k == curses.KEY_RESIZE:
                 h, w = self._curses_window.getmaxyx()
                 for window in self._stack:
                     window.resize(h, w)
+                self._drawn_stack = None
             elif self._stack:
-                self._stack[-1].handle_key(k)
+                window = self._stack[-1]
+                window.handle_key(k)
+                window.mark_dirty()
 
     def _get_chars(self):
         while True:
@@ -56,8 +98,12 @@ class BaseManager(object):
     def stack(self):
         return self._stack
 
+    @property
+    def scheduler(self):
+        return self._scheduler
+
     def run(self, window):
         window.show()
 
-    def wait(self):
+    def wait(self, timeout=None):
         raise RuntimeError('Not implemented')
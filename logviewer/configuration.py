@@ -2,11 +2,16 @@ import configparser
 import os.path
 
 class Configuration(object):
+    DEFAULT_MAX_FPS = 30
+
     class Error(Exception):
         pass
 
     def __init__(self, filename, driver_map):
         self._timeout = None
+        self._max_lines = None
+        self._max_bytes = None
+        self._max_fps = Configuration.DEFAULT_MAX_FPS
         self._driver_map = driver_map
         self._driver = None
         self._driver_args = {}
@@ -25,6 +30,12 @@ class Configuration(object):
         main = config['main']
         if 'timeout' in main:
             self._timeout = float(main['timeout'])
+        if 'max_lines' in main:
+            self._max_lines = int(main['max_lines'])
+        if 'max_bytes' in main:
+            self._max_bytes = int(main['max_bytes'])
+        if 'max_fps' in main:
+            self._max_fps = float(main['max_fps']) or None
         if 'backend' in main:
             backend = main['backend']
             if not backend in self._driver_map:
@@ -37,6 +48,18 @@ class Configuration(object):
     def timeout(self):
         return self._timeout
 
+    @property
+    def max_lines(self):
+        return self._max_lines
+
+    @property
+    def max_bytes(self):
+        return self._max_bytes
+
+    @property
+    def max_fps(self):
+        return self._max_fps
+
     def get_factory(self):
         if not self._driver:
             raise Configuration.Error("No backend configured")
@@ -1,9 +1,14 @@
+import threading
+
 import mysql.connector
+from mysql.connector import errorcode
 
 from . import sql_driver
 from . import screen_buffer
 
 class MySQLDriver(sql_driver.SQLDriver):
+    PLACEHOLDER = '%s'
+
     class Factory(object):
         def __init__(self, **mysql_conf):
             self._mysql_conf = mysql_conf
@@ -18,24 +23,95 @@ class MySQLDriver(sql_driver.SQLDriver):
     def __init__(self, mysql_conf, **kwargs):
         sql_driver.SQLDriver.__init__(self, **kwargs)
         self._mysql_conf = mysql_conf
+        self._connection = None
+        self._cursors = dict()
+        self._kill_lock = threading.Lock()
+        self._kill_thread = None
+        self._in_flight = False
+
+    def _same_database(self, other):
+        return self._mysql_conf == other._mysql_conf
+
+    # a KILL QUERY names the connection, not the query: one still on its way
+    # would hit the first query of the driver taking the connection over, so
+    # it is waited for before the handover
+    def take_connection(self, other):
+        if type(other) is not type(self):
+            return False
+        with other._kill_lock:
+            if other._kill_thread:
+                other._kill_thread.join()
+            return sql_driver.SQLDriver.take_connection(self, other)
 
     def start_connection(self):
         self._connection = mysql.connector.connect(**(self._mysql_conf))
 
     def stop_connection(self):
+        self.close_statements()
         self._connection.close()
 
-    def select(self, cmd):
-        result = self._connection.cursor()
-        result.execute(cmd)
+    def _kill_query(self, connection_id):
+        try:
+            connection = mysql.connector.connect(**(self._mysql_conf))
+            try:
+                connection.cursor().execute('KILL QUERY {}'.format(connection_id))
+            finally:
+                connection.close()
+        except mysql.connector.Error:
+            pass
+
+    # KILL QUERY has to be sent over a second connection; that is done in the
+    # background so that the caller never waits for a connect. An idle
+    # connection has nothing to kill, which spares a restart between refills
+    # the connect and the wait for it in take_connection
+    def cancel(self):
+        with self._kill_lock:
+            connection = self._connection
+            if connection and self._in_flight:
+                self._kill_thread = threading.Thread(target=self._kill_query,
+                    args=(connection.connection_id,), daemon=True)
+                self._kill_thread.start()
+
+    def _call(self, method, *args):
+        with self._kill_lock:
+            self._in_flight = True
+        try:
+            return method(*args)
+        except mysql.connector.Error as e:
+            raise self._translate_error(e)
+        finally:
+            with self._kill_lock:
+                self._in_flight = False
+
+    def _translate_error(self, e):
+        if e.errno == errorcode.ER_QUERY_INTERRUPTED:
+            self._connection.rollback()
+            return screen_buffer.ScreenBuffer.Cancelled()
+        return e
+
+    # one prepared cursor per statement text: the server parses and plans
+    # each statement once, later executions only send the parameters
+    def select(self, cmd, params=()):
+        result = self._cursors.get(cmd)
+        if result is None:
+            result = self._cursors[cmd] = self._connection.cursor(prepared=True)
+        self._call(result.execute, cmd, params)
         return result
 
-    def fetch_record(self, query):
-        rec = query.fetchone()
-        if rec is None:
-            query.close()
+    def close_statements(self):
+        cursors, self._cursors = self._cursors, dict()
+        for cursor in cursors.values():
+            cursor.close()
+
+    # prepared cursors are kept for the next execution, only their result is
+    # finished; the rollback ends the read transaction, so that the next query
+    # sees rows added since
+    def close_cursor(self, cursor):
+        try:
+            if self._connection.unread_result:
+                cursor.fetchall()
+        finally:
             self._connection.rollback()
-            return
-        return { 'id': rec[0], 'facility_num': str(rec[1]),
-            'level_num': str(rec[2]), 'host': rec[3], 'datetime': rec[4],
-            'program': rec[5], 'pid': rec[6], 'message': rec[7] }
+
+    def fetch_rows(self, query, count):
+        return self._call(query.fetchmany, count)
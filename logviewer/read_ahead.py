@@ -0,0 +1,99 @@
+import time
+import collections
+
+# sizes the prefetch on each side of the visible page: the side being scrolled
+# towards gets enough lines to cover the scrolling that happens while one
+# query is in flight, the other side shrinks accordingly. Without a measured
+# scroll speed or query latency the configured sizes are used as they are
+class ReadAhead(object):
+    WINDOW = 1.0
+    SAFETY = 2.0
+    MAX_FACTOR = 8
+    CHUNK_TIME = 0.05
+    SMOOTHING = 0.3
+
+    def __init__(self, page_size, buffer_size, low_buffer_threshold,
+            clock=time.monotonic):
+        self._page_size = page_size
+        self._buffer_size = buffer_size
+        self._low_buffer_threshold = low_buffer_threshold
+        self._clock = clock
+        self._scrolls = collections.deque()
+        self._query_time = None
+        self._record_time = None
+
+    @property
+    def page_size(self):
+        return self._page_size
+
+    @page_size.setter
+    def page_size(self, val):
+        self._page_size = val
+
+    @property
+    def query_time(self):
+        return self._query_time
+
+    @property
+    def record_time(self):
+        return self._record_time
+
+    @property
+    def velocity(self):
+        self._expire(self._clock())
+        return sum(x[1] for x in self._scrolls) / ReadAhead.WINDOW
+
+    def _expire(self, now):
+        while self._scrolls and now - self._scrolls[0][0] > ReadAhead.WINDOW:
+            self._scrolls.popleft()
+
+    def _smooth(self, old, new):
+        return new if old is None else old + ReadAhead.SMOOTHING * (new - old)
+
+    def scrolled(self, lines):
+        now = self._clock()
+        self._scrolls.append((now, lines))
+        self._expire(now)
+
+    def fetched(self, count, elapsed):
+        if elapsed <= 0:
+            return
+        self._query_time = self._smooth(self._query_time, elapsed)
+        if count > 0:
+            self._record_time = self._smooth(self._record_time, elapsed / count)
+
+    def _get_demand(self, desc):
+        if self._query_time is None:
+            return 0
+        v = self.velocity
+        if v == 0 or (v < 0) != desc:
+            return 0
+        return int(abs(v) * self._query_time * ReadAhead.SAFETY)
+
+    def _get_ahead_size(self, desc):
+        return min(max(self._buffer_size, 2 * self._get_demand(desc)),
+            self._buffer_size * ReadAhead.MAX_FACTOR)
+
+    def get_threshold(self, desc):
+        return min(max(self._low_buffer_threshold, self._get_demand(desc)),
+            self._buffer_size * ReadAhead.MAX_FACTOR)
+
+    def get_size(self, desc):
+        size = self._get_ahead_size(desc)
+        if size > self._buffer_size:
+            return size
+        other = self._get_ahead_size(not desc)
+        return max(self._buffer_size * self._buffer_size // other, self._page_size)
+
+    def get_margin(self, desc):
+        return self.get_size(desc) + self.get_threshold(desc)
+
+    # read-ahead in the scroll direction is needed as a whole, anything else is
+    # split into chunks that take about CHUNK_TIME each
+    def get_chunk_size(self, desc, count):
+        if self._get_demand(desc) > 0:
+            return count
+        if self._record_time is None:
+            return min(self._page_size, count)
+        chunk = int(ReadAhead.CHUNK_TIME / self._record_time)
+        return min(max(chunk, self._page_size), count)
@@ -0,0 +1,41 @@
+import time
+
+class RenderScheduler(object):
+    def __init__(self, max_fps=None, clock=time.monotonic):
+        self._interval = 1.0 / max_fps if max_fps else 0.0
+        self._clock = clock
+        self._last_frame = None
+        self._pending_events = 0
+
+        self._frames = 0
+        self._deferred = 0
+        self._merged = 0
+
+    @property
+    def frames(self):
+        return self._frames
+
+    @property
+    def deferred(self):
+        return self._deferred
+
+    @property
+    def merged(self):
+        return self._merged
+
+    def add_events(self, count):
+        self._pending_events += count
+
+    def get_delay(self):
+        if self._last_frame is None:
+            return 0.0
+        return max(0.0, self._last_frame + self._interval - self._clock())
+
+    def frame_deferred(self):
+        self._deferred += 1
+
+    def frame_rendered(self):
+        self._last_frame = self._clock()
+        self._frames += 1
+        self._merged += max(0, self._pending_events - 1)
+        self._pending_events = 0
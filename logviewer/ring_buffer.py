@@ -0,0 +1,75 @@
+class RingBuffer(object):
+    def __init__(self, capacity=16):
+        self._capacity = 1
+        while self._capacity < capacity:
+            self._capacity <<= 1
+        self.clear()
+
+    def __len__(self):
+        return self._len
+
+    def __iter__(self):
+        for i in range(self._len):
+            yield self._items[(self._head + i) & self._mask]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._get_slice(key)
+        if key < 0:
+            key += self._len
+        if key < 0 or key >= self._len:
+            raise IndexError('{} index out of range'.format(self.__class__.__name__))
+        return self._items[(self._head + key) & self._mask]
+
+    def _get_slice(self, key):
+        start, stop, step = key.indices(self._len)
+        if step != 1:
+            return [self[i] for i in range(start, stop, step)]
+        if stop <= start:
+            return []
+        a = (self._head + start) & self._mask
+        b = a + stop - start
+        if b <= len(self._items):
+            return self._items[a:b]
+        return self._items[a:] + self._items[:b - len(self._items)]
+
+    def _grow(self):
+        old = len(self._items)
+        self._items = self[:] + [None] * old
+        self._mask = 2 * old - 1
+        self._head = 0
+
+    def append(self, item):
+        if self._len == len(self._items):
+            self._grow()
+        self._items[(self._head + self._len) & self._mask] = item
+        self._len += 1
+
+    def appendleft(self, item):
+        if self._len == len(self._items):
+            self._grow()
+        self._head = (self._head - 1) & self._mask
+        self._items[self._head] = item
+        self._len += 1
+
+    def pop(self):
+        if self._len == 0:
+            raise IndexError('pop from an empty {}'.format(self.__class__.__name__))
+        self._len -= 1
+        i = (self._head + self._len) & self._mask
+        result, self._items[i] = self._items[i], None
+        return result
+
+    def popleft(self):
+        if self._len == 0:
+            raise IndexError('pop from an empty {}'.format(self.__class__.__name__))
+        result, self._items[self._head] = self._items[self._head], None
+        self._head = (self._head + 1) & self._mask
+        self._len -= 1
+        return result
+
+    def clear(self):
+        self._items = [None] * self._capacity
+        self._mask = self._capacity - 1
+        self._head = 0
+        self._len = 0
@@ -1,9 +1,42 @@
+import sys
+import time
+import array
+import datetime
 import threading
+import collections
+
+from .ring_buffer import RingBuffer
+from .read_ahead import ReadAhead
+
+def _intern(val):
+    return sys.intern(val) if isinstance(val, str) else val
 
 class ScreenBuffer(object):
     STOP = 1
     GET_RECORDS = 2
     TIMEOUT = 3
+    RESTART = 4
+    LINE_OVERHEAD = 128
+    BATCH_OVERHEAD = 1024
+    MERGE_ROWS = 64
+    JOIN_TIMEOUT = 1.0
+
+    class Cancelled(Exception):
+        pass
+
+    Record = collections.namedtuple('Record', ['id', 'facility_num',
+        'level_num', 'host', 'datetime', 'program', 'pid', 'message'])
+
+    # an immutable view of the visible page, published by whichever thread
+    # changed the buffer; readers take it without locking
+    Snapshot = collections.namedtuple('Snapshot', ['version', 'page_size',
+        'entries', 'lines', 'bytes', 'scan_progress'])
+
+    @staticmethod
+    def make_record(id, facility_num, level_num, host, datetime, program, pid,
+            message):
+        return ScreenBuffer.Record(id, facility_num, level_num, _intern(host),
+            datetime, _intern(program), pid, message)
 
     class Driver(object):
         def has_start_date(self):
@@ -15,21 +48,210 @@ class ScreenBuffer(object):
         def stop_connection(self):
             pass
 
+        # takes over the open connection of a driver that is being replaced,
+        # returns False if it can't be reused and a new one must be opened
+        def take_connection(self, other):
+            return False
+
+        # called from another thread to abort the query in flight, which then
+        # raises ScreenBuffer.Cancelled in the fetching thread
+        def cancel(self):
+            pass
+
         def prepare_datetime_query(self):
             pass
 
+        # id of the first record at or after the start date, None if there is
+        # no such record
+        def seek_start_date(self):
+            query = self.prepare_datetime_query()
+            rec = tmp = self.fetch_record(query)
+            while tmp:
+                tmp = self.fetch_record(query)
+            return rec.id if rec else None
+
         def prepare_query(self, start, desc, count):
             pass
 
         def fetch_record(self, query):
             pass
 
+        def fetch_records(self, query, count):
+            result = list()
+            while len(result) < count:
+                rec = self.fetch_record(query)
+                if rec is None:
+                    break
+                result.append(rec)
+            return result
+
+        def fetch_batch(self, query, count):
+            return ScreenBuffer.RecordBatch.from_records(
+                self.fetch_records(query, count))
+
+        # a driver that scans the table in steps may return a short batch
+        # before the end; while the query can still find records this gives
+        # the ids scanned so far and the ids to scan in all, otherwise None
+        def get_scan_progress(self, query):
+            return None
+
+    # column-oriented set of records: timestamps are kept as seconds since the
+    # epoch and host/program as indices into a table of (interned) strings;
+    # missing codes and timestamps are stored as NULL
+    class RecordBatch(object):
+        EPOCH = datetime.datetime(1970, 1, 1)
+        SECOND = datetime.timedelta(seconds=1)
+        NULL = -1
+        NULL_TIMESTAMP = -(2 ** 63)
+
+        def __init__(self):
+            self._ids = array.array('q')
+            self._timestamps = array.array('q')
+            self._facilities = array.array('i')
+            self._levels = array.array('i')
+            self._hosts = array.array('i')
+            self._programs = array.array('i')
+            self._pids = list()
+            self._messages = list()
+            self._strings = list()
+            self._string_map = dict()
+
+        @staticmethod
+        def from_records(recs):
+            result = ScreenBuffer.RecordBatch()
+            for rec in recs:
+                result.append_record(rec)
+            return result
+
+        @staticmethod
+        def to_timestamp(dt):
+            if dt is None:
+                return ScreenBuffer.RecordBatch.NULL_TIMESTAMP
+            return (dt - ScreenBuffer.RecordBatch.EPOCH) // ScreenBuffer.RecordBatch.SECOND
+
+        @staticmethod
+        def to_datetime(timestamp):
+            if timestamp == ScreenBuffer.RecordBatch.NULL_TIMESTAMP:
+                return None
+            return ScreenBuffer.RecordBatch.EPOCH + datetime.timedelta(seconds=timestamp)
+
+        def __len__(self):
+            return len(self._ids)
+
+        def _encode(self, val):
+            result = self._string_map.get(val)
+            if result is None:
+                result = self._string_map[val] = len(self._strings)
+                self._strings.append(_intern(val))
+            return result
+
+        def _decode_code(self, val):
+            return None if val == ScreenBuffer.RecordBatch.NULL else val
+
+        def append(self, id, facility_num, level_num, host, timestamp, program,
+                pid, message):
+            null = ScreenBuffer.RecordBatch.NULL
+            self._ids.append(id)
+            self._facilities.append(null if facility_num is None else facility_num)
+            self._levels.append(null if level_num is None else level_num)
+            self._hosts.append(self._encode(host))
+            self._timestamps.append(timestamp)
+            self._programs.append(self._encode(program))
+            self._pids.append(pid)
+            self._messages.append(message)
+
+        def append_record(self, rec):
+            self.append(rec.id, rec.facility_num, rec.level_num, rec.host,
+                ScreenBuffer.RecordBatch.to_timestamp(rec.datetime), rec.program,
+                rec.pid, rec.message)
+
+        def append_row(self, other, i):
+            self._ids.append(other._ids[i])
+            self._timestamps.append(other._timestamps[i])
+            self._facilities.append(other._facilities[i])
+            self._levels.append(other._levels[i])
+            self._hosts.append(self._encode(other._strings[other._hosts[i]]))
+            self._programs.append(self._encode(other._strings[other._programs[i]]))
+            self._pids.append(other._pids[i])
+            self._messages.append(other._messages[i])
+
+        def record(self, i):
+            return ScreenBuffer.Record(self._ids[i],
+                self._decode_code(self._facilities[i]),
+                self._decode_code(self._levels[i]),
+                self._strings[self._hosts[i]],
+                ScreenBuffer.RecordBatch.to_datetime(self._timestamps[i]),
+                self._strings[self._programs[i]], self._pids[i],
+                self._messages[i])
+
+        def get_id(self, i):
+            return self._ids[i]
+
+        def get_host(self, i):
+            return self._strings[self._hosts[i]]
+
+        def get_program(self, i):
+            return self._strings[self._programs[i]]
+
+        def get_message(self, i):
+            return self._messages[i]
+
+        @property
+        def ids(self):
+            return self._ids
+
+        @property
+        def timestamps(self):
+            return self._timestamps
+
+        @property
+        def facilities(self):
+            return self._facilities
+
+        @property
+        def levels(self):
+            return self._levels
+
+        @property
+        def hosts(self):
+            return self._hosts
+
+        @property
+        def programs(self):
+            return self._programs
+
+        @property
+        def pids(self):
+            return self._pids
+
+        @property
+        def messages(self):
+            return self._messages
+
+        @property
+        def strings(self):
+            return self._strings
+
     class Thread(threading.Thread):
         def __init__(self, screen_buffer, driver):
-            threading.Thread.__init__(self)
+            threading.Thread.__init__(self, daemon=True)
             self._screen_buffer = screen_buffer
             self._driver = driver
 
+        @property
+        def driver(self):
+            return self._driver
+
+        def cancel(self):
+            self._driver.cancel()
+
+        def _switch_driver(self, driver):
+            if not driver.take_connection(self._driver):
+                self._driver.stop_connection()
+                driver.start_connection()
+            self._driver = driver
+            self._screen_buffer._reset()
+
         def run(self):
             self._screen_buffer.clear()
             self._driver.start_connection()
@@ -39,7 +261,15 @@ class ScreenBuffer(object):
                     cmd = self._screen_buffer._wait_event(timeout)
                     if cmd == ScreenBuffer.STOP:
                         return
-                    timeout = self._screen_buffer.get_records(self._driver)
+                    if cmd == ScreenBuffer.RESTART:
+                        self._switch_driver(self._screen_buffer._take_driver())
+                        timeout = None
+                        continue
+                    try:
+                        timeout = self._screen_buffer.get_records(self._driver)
+                    except ScreenBuffer.Cancelled:
+                        timeout = None
+                        self._screen_buffer._invalidate()
             finally:
                 self._driver.stop_connection()
 
@@ -51,24 +281,21 @@ class ScreenBuffer(object):
         LEVELS = ['emerg', 'alert', 'crit', 'err', 'warning', 'notice', 'info',
             'debug']
 
-        def __init__(self, data, is_continuation):
-            self._id = data['id']
-            self._datetime = data['datetime']
-            self._host = data['host']
-            self._program = data['program']
-            self._facility = self._translate(ScreenBuffer.Line.FACILITIES, data['facility_num'])
-            self._level = self._translate(ScreenBuffer.Line.LEVELS, data['level_num'])
-            self._message = data['message']
-            self._is_continuation = is_continuation
+        FACILITY_NAMES = dict(enumerate(FACILITIES))
+        LEVEL_NAMES = dict(enumerate(LEVELS))
 
-        def _translate(self, table, val):
-            if not isinstance(val, int):
-                if not isinstance(val, str) or not val.isdigit():
-                    return ''
-                val = int(val)
-            if val < 0 or val >= len(table):
-                return ''
-            return table[val]
+        __slots__ = ('_id', '_datetime', '_host', '_program', '_facility',
+            '_level', '_message', '_is_continuation')
+
+        def __init__(self, rec, is_continuation, message=None):
+            self._id = rec.id
+            self._datetime = rec.datetime
+            self._host = rec.host
+            self._program = rec.program
+            self._facility = ScreenBuffer.Line.FACILITY_NAMES.get(rec.facility_num, '')
+            self._level = ScreenBuffer.Line.LEVEL_NAMES.get(rec.level_num, '')
+            self._message = rec.message if message is None else message
+            self._is_continuation = is_continuation
 
         @property
         def id(self):
@@ -103,8 +330,9 @@ class ScreenBuffer(object):
             return self._is_continuation
 
     def __init__(self, page_size, buffer_size=None, low_buffer_threshold=None,
-            timeout=None):
-        self._observers = set()
+            timeout=None, max_lines=None, max_bytes=None, clock=time.monotonic):
+        self._observers = frozenset()
+        self._observer_lock = threading.Lock()
 
         self._page_size = page_size
         self._buffer_size = buffer_size \
@@ -112,25 +340,155 @@ class ScreenBuffer(object):
         self._low_buffer_threshold = low_buffer_threshold \
             if not low_buffer_threshold is None else page_size
         self._timeout = timeout
+        self._max_lines = max_lines
+        self._max_bytes = max_bytes
+        self._clock = clock
+        self._read_ahead = ReadAhead(self._page_size, self._buffer_size,
+            self._low_buffer_threshold, clock)
 
         self._auto_scroll = True
+        self._version = 0
         self._lines = None
+        self._line_cache = None
+        self._bytes = None
+        self._batches = None
+        self._open_batches = None
+        self._snapshot = None
+        self._scan_progress = None
         self._position = None
         self._bottom_seen = None
-        self._stopped = None
         self._invalid = None
+        self._requests = 0
+        self._next_driver = None
         self._thread = None
         self._lock = threading.Lock()
         self._condition_var = threading.Condition(self._lock)
 
         self.clear()
 
-    def _build_lines(self, rec):
-        msgs = rec['message'].split('\n')
+    # the buffer stores one entry per physical line, pointing into the record
+    # batch it was fetched with: a (batch, row) tuple for single-line messages,
+    # or a (batch, row, index, message) tuple for each line of a multi-line
+    # one. Line objects are only built for the lines actually shown on screen
+    def _build_lines(self, batch, row):
+        msgs = batch.get_message(row).split('\n')
+        if len(msgs) == 1:
+            yield (batch, row)
+            return
         for i, msg in enumerate(msgs):
-            tmp = rec.copy()
-            tmp['message'] = msg
-            yield ScreenBuffer.Line(tmp, i > 0)
+            yield (batch, row, i, msg)
+
+    def _unpack(self, entry):
+        if len(entry) == 2:
+            return entry[0], entry[1], 0, entry[0].get_message(entry[1])
+        return entry
+
+    def _get_id(self, entry):
+        return entry[0].get_id(entry[1])
+
+    def _get_line(self, entry, cache):
+        batch, row, i, msg = self._unpack(entry)
+        key = (batch.get_id(row), i)
+        line = self._line_cache.get(key)
+        if line is None:
+            line = ScreenBuffer.Line(batch.record(row), i > 0, msg)
+        cache[key] = line
+        return line
+
+    def _line_size(self, entry):
+        batch, row, i, msg = self._unpack(entry)
+        return ScreenBuffer.LINE_OVERHEAD + len(msg) + \
+            len(batch.get_host(row) or '') + len(batch.get_program(row) or '')
+
+    # a batch stays in memory as long as any of its lines is buffered, so its
+    # bytes, its own overhead included, are only given back when the last of
+    # them is evicted. 'batches' maps each batch to the number of its lines
+    # held and their size
+    def _add_line(self, line, prepend):
+        if prepend:
+            self._lines.appendleft(line)
+        else:
+            self._lines.append(line)
+        held = self._batches.get(line[0])
+        if held is None:
+            held = self._batches[line[0]] = [0, ScreenBuffer.BATCH_OVERHEAD]
+            self._bytes += ScreenBuffer.BATCH_OVERHEAD
+        size = self._line_size(line)
+        held[0] += 1
+        held[1] += size
+        self._bytes += size
+
+    def _drop_line(self, line):
+        held = self._batches[line[0]]
+        held[0] -= 1
+        if held[0] == 0:
+            del self._batches[line[0]]
+            self._bytes -= held[1]
+            self._open_batches = [None if x is line[0] else x
+                for x in self._open_batches]
+
+    # a batch of few records costs more than its records, so small inserts
+    # are copied into an open batch kept for their side of the buffer, one
+    # for appending and one for prepending, up to MERGE_ROWS rows each
+    def _get_open_batch(self, prepend):
+        batch = self._open_batches[prepend]
+        if batch is None or len(batch) >= ScreenBuffer.MERGE_ROWS:
+            batch = self._open_batches[prepend] = ScreenBuffer.RecordBatch()
+        return batch
+
+    # the (batch, row) pairs to insert
+    def _stage_batch(self, batch, prepend):
+        if len(batch) >= ScreenBuffer.MERGE_ROWS:
+            return [(batch, row) for row in range(len(batch))]
+        result = []
+        for row in range(len(batch)):
+            target = self._get_open_batch(prepend)
+            target.append_row(batch, row)
+            result.append((target, len(target) - 1))
+        return result
+
+    def _stage_records(self, recs, prepend):
+        result = []
+        for rec in recs:
+            target = self._get_open_batch(prepend)
+            target.append_record(rec)
+            result.append((target, len(target) - 1))
+        return result
+
+    def _is_over_limit(self):
+        return (not self._max_lines is None and len(self._lines) > self._max_lines) or \
+            (not self._max_bytes is None and self._bytes > self._max_bytes)
+
+    def _get_record_length(self, from_start):
+        step, i = (1, 0) if from_start else (-1, -1)
+        batch, row = self._lines[i][:2]
+        count = 0
+        while count < len(self._lines) and self._lines[i][0] is batch and \
+                self._lines[i][1] == row:
+            count += 1
+            i += step
+        return count
+
+    def _evict(self):
+        # never evict so much that the evicted side would fall below the refill
+        # threshold; otherwise the fetch thread would keep reloading what was
+        # just thrown away. The side with the most to spare goes first. The
+        # limits are therefore not reached while they are smaller than the
+        # page and the read-ahead margins around it: that much is always kept
+        while self._is_over_limit():
+            above = self._position - self._read_ahead.get_margin(True)
+            below = len(self._lines) - self._position - self._page_size - \
+                self._read_ahead.get_margin(False)
+            from_start = above >= below
+            count = self._get_record_length(from_start)
+            if (above if from_start else below) - count < 0:
+                return
+            for i in range(count):
+                line = self._lines.popleft() if from_start else self._lines.pop()
+                self._drop_line(line)
+            if from_start:
+                self._position -= count
+                self._bottom_seen = False
 
     def _set_position(self, pos):
         p_min, p_max = 0, max(len(self._lines) - self._page_size, 0)
@@ -145,151 +503,304 @@ class ScreenBuffer(object):
         if self._position + self._page_size > len(self._lines):
             self._set_position(len(self._lines) - self._page_size)
 
+    def _publish(self):
+        p = self._position
+        self._snapshot = ScreenBuffer.Snapshot(self._version, self._page_size,
+            tuple(self._lines[p:p + self._page_size]), len(self._lines),
+            self._bytes, self._scan_progress)
+
     def _notify_observers(self):
         for observer in self._observers:
             observer()
 
+    # a worker is stopped as soon as it is no longer the buffer's thread, so
+    # one left behind by a timed out join can't touch a restarted buffer
+    def _is_stopped(self):
+        return threading.current_thread() is not self._thread
+
+    def _is_interrupted(self):
+        if not isinstance(threading.current_thread(), ScreenBuffer.Thread):
+            return False
+        return self._is_stopped() or not self._next_driver is None
+
     def _wait_event(self, timeout=None):
         if not self._condition_var:
             return
 
         with self._condition_var:
-            while not (self._stopped or self._invalid):
+            while not (self._is_stopped() or self._invalid or self._next_driver):
                 if not self._condition_var.wait(timeout):
                     return ScreenBuffer.TIMEOUT
-            if self._stopped:
+            if self._is_stopped():
                 return ScreenBuffer.STOP
+            if self._next_driver:
+                return ScreenBuffer.RESTART
             self._invalid = False
             return ScreenBuffer.GET_RECORDS
 
+    def _take_driver(self):
+        with self._condition_var:
+            driver, self._next_driver = self._next_driver, None
+            return driver
+
+    def _reset(self):
+        self._bottom_seen = False
+        self._auto_scroll = True
+        self.clear()
+
     def _invalidate(self):
         if self._condition_var is None:
             return
 
         with self._condition_var:
             self._invalid = True
+            self._requests += 1
             self._condition_var.notify()
 
     @property
     def page_size(self):
-        with self._lock:
-            return self._page_size
+        return self._snapshot.page_size
 
     @page_size.setter
     def page_size(self, val):
         with self._lock:
             self._page_size = val
+            self._read_ahead.page_size = val
             self._check_page_size()
+            self._version += 1
+            self._publish()
+
+    @property
+    def version(self):
+        return self._snapshot.version
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    @property
+    def scan_progress(self):
+        return self._snapshot.scan_progress
+
+    @property
+    def footprint(self):
+        snapshot = self._snapshot
+        return snapshot.lines, snapshot.bytes
 
     def get_current_lines(self):
-        with self._lock:
-            p = self._position
-            q = p + self._page_size
-            return self._lines[p:q]
+        cache = dict()
+        result = [self._get_line(x, cache) for x in self._snapshot.entries]
+        self._line_cache = cache
+        return result
 
-    def go_to_previous_line(self):
+    def _scroll(self, lines=0, pages=0):
         with self._lock:
-            self._set_position(self._position - 1)
+            old_pos = self._position
+            self._read_ahead.scrolled(lines + pages * self._page_size)
+            self._set_position(self._position + lines + pages * self._page_size)
+            if self._position != old_pos:
+                self._version += 1
+                self._publish()
         self._invalidate()
 
+    def go_to_previous_line(self):
+        self._scroll(lines=-1)
+
     def go_to_next_line(self):
-        with self._lock:
-            self._set_position(self._position + 1)
-        self._invalidate()
+        self._scroll(lines=1)
 
     def go_to_previous_page(self):
-        with self._lock:
-            self._set_position(self._position - self._page_size)
-        self._invalidate()
+        self._scroll(pages=-1)
 
     def go_to_next_page(self):
-        with self._lock:
-            self._set_position(self._position + self._page_size)
-        self._invalidate()
+        self._scroll(pages=1)
 
-    def prepend_record(self, rec):
+    def _prepend(self, stage, items):
         with self._lock:
-            cnt = 0
-            old_pos = self._position
-            for i, line in enumerate(self._build_lines(rec)):
-                cnt += 1
-                self._lines.insert(i, line)
+            old_pos, cnt = self._position, 0
+            for batch, row in stage(items, True):
+                lines = list(self._build_lines(batch, row))
+                cnt += len(lines)
+                for line in reversed(lines):
+                    self._add_line(line, True)
+            if cnt == 0:
+                return
             self._set_position(self._position + cnt)
             notify = old_pos + cnt != self._position
+            if notify:
+                self._version += 1
+            self._evict()
+            self._publish()
+
         if notify:
             self._notify_observers()
 
-    def append_record(self, rec):
+    def prepend_batch(self, batch):
+        self._prepend(self._stage_batch, batch)
+
+    def prepend_records(self, recs):
+        self._prepend(self._stage_records, recs)
+
+    def prepend_record(self, rec):
+        self.prepend_records((rec,))
+
+    def _append(self, stage, items):
         with self._lock:
             old_len = len(self._lines)
-            for line in self._build_lines(rec):
-                self._lines.append(line)
+            for batch, row in stage(items, False):
+                for line in self._build_lines(batch, row):
+                    self._add_line(line, False)
 
-            if old_len - self._position <= self._page_size and self._auto_scroll:
+            if len(self._lines) == old_len:
+                notify = False
+            elif old_len - self._position <= self._page_size and self._auto_scroll:
                 notify = True
                 self._set_position(len(self._lines) - self._page_size)
             elif old_len < self._page_size:
                 notify = True
             else:
                 notify = False
+            if notify:
+                self._version += 1
+            self._evict()
+            self._publish()
 
         if notify:
             self._notify_observers()
 
+    def append_batch(self, batch):
+        self._append(self._stage_batch, batch)
+
+    def append_records(self, recs):
+        self._append(self._stage_records, recs)
+
+    def append_record(self, rec):
+        self.append_records((rec,))
+
+    # observers are kept in a frozenset that is replaced on every change, so
+    # notifying never has to lock against add/remove from another thread
     def add_observer(self, observer):
-        # TODO: add/remove observer will be called from different threads; make
-        # them thread safe!
-        self._observers.add(observer)
+        with self._observer_lock:
+            self._observers = self._observers | {observer}
 
     def remove_observer(self, observer):
-        self._observers.remove(observer)
-
-    def get_buffer_instructions(self, driver):
+        with self._observer_lock:
+            if not observer in self._observers:
+                raise KeyError(observer)
+            self._observers = self._observers - {observer}
+
+    def _get_distance(self, desc):
+        if desc:
+            return self._position
+        return len(self._lines) - self._position - self._page_size
+
+    # the side closer to the visible page is refilled first
+    def _get_refill_instructions(self):
         result = []
+        read_ahead = self._read_ahead
+        if self._get_distance(False) <= read_ahead.get_threshold(False):
+            result.append((self._get_id(self._lines[-1]), False,
+                read_ahead.get_size(False)))
+        if self._get_distance(True) <= read_ahead.get_threshold(True):
+            result.append((self._get_id(self._lines[0]), True,
+                read_ahead.get_size(True)))
+        result.sort(key=lambda x: self._get_distance(x[1]))
+        return tuple(result)
+
+    def _is_urgent(self, desc):
+        with self._lock:
+            return self._get_distance(desc) < self._page_size
 
+    # the driver is never called with the lock held: a slow query must not
+    # block the UI thread, which takes the lock to read lines and resize
+    def get_buffer_instructions(self, driver):
         with self._lock:
             if self._lines:
-                if self._position + self._page_size >= len(self._lines) - self._low_buffer_threshold:
-                    result.append((self._lines[-1].id, False, self._buffer_size))
-                if self._position <= self._low_buffer_threshold:
-                    result.append((self._lines[0].id, True, self._buffer_size))
-            else:
-                rec, count = None, self._buffer_size + self._page_size
-                if driver.has_start_date():
-                    query = driver.prepare_datetime_query()
-                    rec = tmp = driver.fetch_record(query)
-                    while tmp:
-                        tmp = driver.fetch_record(query)
-
-                if rec:
-                    self._auto_scroll = False
-                    result.append((rec['id'] - 1, False, count))
-                    result.append((rec['id'], True, self._buffer_size))
-                else:
-                    result.append((None, True, count))
+                return self._get_refill_instructions()
+            count = self._buffer_size + self._page_size
 
-        return tuple(result)
+        start = driver.seek_start_date() if driver.has_start_date() else None
+        if not start is None:
+            self._auto_scroll = False
+            return ((start - 1, False, count), (start, True, self._buffer_size))
+        return ((None, True, count),)
+
+    def _set_scan_progress(self, progress):
+        if progress == self._scan_progress:
+            return
+        with self._lock:
+            self._scan_progress = progress
+            self._version += 1
+            self._publish()
+        self._notify_observers()
+
+    # the records of a scanning query are shown as they are found, and the
+    # progress of the scan along with them; the scan stops as soon as the page
+    # is full. A scan for background read-ahead, or one overtaken by a new
+    # request, stops after one window and is left to a later refill. Returns
+    # the number of records fetched, the id of the last one and whether there
+    # may be more
+    def _fetch(self, driver, start, desc, count):
+        if self._is_interrupted():
+            raise ScreenBuffer.Cancelled()
+        t, requests = self._clock(), self._requests
+        query = driver.prepare_query(start, desc, count)
+        n, last = 0, start
+        try:
+            while True:
+                batch = driver.fetch_batch(query, count - n)
+                if self._is_interrupted():
+                    raise ScreenBuffer.Cancelled()
+                if desc:
+                    self.prepend_batch(batch)
+                else:
+                    self.append_batch(batch)
+                if len(batch) > 0:
+                    n, last = n + len(batch), batch.get_id(len(batch) - 1)
+                progress = driver.get_scan_progress(query)
+                if progress is None or n >= count or \
+                        self._requests != requests or not self._is_urgent(desc):
+                    break
+                self._set_scan_progress(progress)
+        finally:
+            self._set_scan_progress(None)
+        with self._lock:
+            self._read_ahead.fetched(n, self._clock() - t)
+        return n, last, n >= count or not progress is None
 
+    # what is on screen, or a page away from it, is fetched in one go; other
+    # read-ahead is fetched a page at a time and given up as soon as another
+    # request comes in, so that the worker can start over with what is needed
+    # first
     def get_records(self, driver):
-        result = None
+        result, requests = None, self._requests
 
         for start, desc, count in self.get_buffer_instructions(driver):
             if desc and self._bottom_seen:
                 continue
 
-            query = driver.prepare_query(start, desc, count)
-            while True:
-                rec = driver.fetch_record(query)
-                if rec is None:
+            if start is None or self._is_urgent(desc):
+                step = count
+            else:
+                with self._lock:
+                    step = self._read_ahead.get_chunk_size(desc, count)
+            pos, more = start, True
+            while count > 0:
+                if self._requests != requests:
+                    self._auto_scroll = True
+                    return None
+                n = min(step, count)
+                fetched, pos, more = self._fetch(driver, pos, desc, n)
+                count -= fetched
+                if fetched < n:
                     break
-                count -= 1
-                if desc:
-                    self.prepend_record(rec)
-                else:
-                    self.append_record(rec)
-            if desc and count > 0:
+            if desc and not more:
                 self._bottom_seen = True
-            if count > 0 and not desc or start is None:
+            if more and count > 0:
+                # a scan that stopped early goes on in the next round, after
+                # the worker has looked for new requests
+                result = 0
+            elif (not more and not desc or start is None) and result is None:
                 result = self._timeout
 
         self._auto_scroll = True
@@ -298,10 +809,18 @@ class ScreenBuffer(object):
     def clear(self):
         with self._lock:
             old_len = 0
-            if not self._lines is None:
+            if self._lines is None:
+                self._lines = RingBuffer()
+            else:
                 old_len = len(self._lines)
-            self._lines = list()
+                self._lines.clear()
+            self._line_cache = dict()
+            self._bytes = 0
+            self._batches = dict()
+            self._open_batches = [None, None]
             self._set_position(0)
+            self._version += 1
+            self._publish()
 
         if old_len > 0:
             self._notify_observers()
@@ -311,22 +830,42 @@ class ScreenBuffer(object):
             raise ValueError('{} driver is already started'.format(self.__class__.__name__))
 
         self._bottom_seen = False
-        self._stopped = False
         self._invalid = True
+        self._next_driver = None
 
         self._thread = ScreenBuffer.Thread(self, driver)
         self._thread.start()
 
+    # the query in flight is cancelled, and a worker that still doesn't
+    # finish in time is left to exit on its own; one that has already exited
+    # has closed its connection and has nothing to cancel
     def stop(self):
-        self._thread, tmp = None, self._thread
-
         with self._condition_var:
-            self._stopped = True
+            self._thread, tmp = None, self._thread
             if tmp:
                 self._condition_var.notify()
         if tmp:
-            tmp.join()
-
+            if tmp.is_alive():
+                tmp.cancel()
+            tmp.join(ScreenBuffer.JOIN_TIMEOUT)
+
+    # a running worker is kept along with its connection and only handed the
+    # new driver; a restart that arrives before the worker picks up the
+    # previous one replaces it. The driver being replaced is taken under the
+    # lock, so that the cancel can't hit the new one if the worker switches
+    # first
     def restart(self, driver):
-        self.stop()
-        self.start(driver)
+        with self._condition_var:
+            tmp = self._thread
+            if tmp and tmp.is_alive():
+                outgoing = tmp.driver
+                self._next_driver = driver
+                self._invalid = True
+                self._condition_var.notify()
+            else:
+                tmp = None
+        if tmp:
+            outgoing.cancel()
+        else:
+            self.stop()
+            self.start(driver)
@@ -1,8 +1,40 @@
 import re
+import collections
 
 from .screen_buffer import ScreenBuffer
 
 class SQLDriver(ScreenBuffer.Driver):
+    STREAM_FACTOR = 4
+    PLACEHOLDER = '?'
+    SCAN_WINDOWS = True
+    MAX_SCAN_STEP = 2 ** 16
+
+    # rows read ahead in one direction; 'anchor' is the id of the last row
+    # handed out, so a query continuing from it can be served from 'rows' and
+    # the rest of the block without going back to the database. A filtered
+    # stream is read in id windows: 'origin' is where the scan started,
+    # 'scanned' how far it got and 'end' the last id of the table
+    class Stream(object):
+        def __init__(self, desc, anchor):
+            self.desc = desc
+            self.anchor = anchor
+            self.rows = collections.deque()
+            self.more = True
+            self.origin = None
+            self.scanned = None
+            self.end = None
+            self.step = None
+
+        @property
+        def is_scan(self):
+            return not self.origin is None
+
+    # the part of a stream one query may read, like a LIMIT
+    class Window(object):
+        def __init__(self, stream, count):
+            self.stream = stream
+            self.remaining = count
+
     def __init__(self, level=None, facility=None, host=None, program=None,
             start_date=None):
         self._level = level
@@ -10,26 +42,261 @@ class SQLDriver(ScreenBuffer.Driver):
         self._host = host
         self._program = program
         self._start_date = start_date
+        self._streams = dict()
+        self._statements = dict()
+        self._hosts = None
+        self._programs = None
+        self._filter_conds, self._filter_params = self._compile_filter()
+
+    def _same_database(self, other):
+        return False
+
+    def take_connection(self, other):
+        if type(other) is not type(self) or not self._same_database(other):
+            return False
+        other.close_statements()
+        self._connection, other._connection = other._connection, None
+        if not other._hosts is None:
+            self.use_dictionaries(other._hosts, other._programs)
+        return True
+
+    # only SQLite3Driver reads the v2 schema: its epoch datetimes and the
+    # case-sensitive name matching below follow SQLite
+    def _has_dictionaries(self):
+        return False
+
+    # called by the backends once connected: a v2 database keeps host and
+    # program names in the 'hosts' and 'programs' tables, and 'logs' refers
+    # to them by id
+    def _connected(self):
+        if self._has_dictionaries():
+            self.use_dictionaries(dict(), dict())
+            self._refresh_dictionaries()
+
+    # the dictionaries map ids to names; the filters on host and program are
+    # resolved against them into lists of ids
+    def use_dictionaries(self, hosts, programs):
+        self._hosts, self._programs = hosts, programs
+        self._statements.clear()
+        self._filter_conds, self._filter_params = self._compile_filter()
+
+    # loads the names added since the last call; the dictionary tables are
+    # small and only grow, so the filter is compiled again when they do
+    def _refresh_dictionaries(self):
+        added = False
+        for table, names in [('hosts', self._hosts),
+                ('programs', self._programs)]:
+            start = max(names) if names else 0
+            for id, name in self._read_all("SELECT id, name FROM {} WHERE "\
+                    "id > {} ORDER BY id".format(table, self.PLACEHOLDER),
+                    (start, ), None):
+                names[id] = name
+                added = True
+        if added:
+            self.use_dictionaries(self._hosts, self._programs)
+        return added
+
+    def _get_name(self, names, id):
+        name = names.get(id)
+        if name is None and not id is None and self._refresh_dictionaries():
+            name = names.get(id)
+        return name
+
+    def _select_rows(self, cmd, params, limit):
+        rows = self._read_all(cmd, params, limit)
+        if self._hosts is None:
+            return rows
+        return [(r[0], r[1], r[2], self._get_name(self._hosts, r[3]), r[4],
+            self._get_name(self._programs, r[5]), r[6], r[7]) for r in rows]
+
+    def _get_columns(self):
+        if self._hosts is None:
+            return 'id, facility_num, level_num, host, datetime, program, pid, message'
+        return 'id, facility_num, level_num, host_id, datetime, program_id, '\
+            'pid, message'
 
     def has_start_date(self):
         return not (not self._start_date)
 
-    def prepare_datetime_query(self):
-        dt_str = self._start_date.strftime('%Y-%m-%d %H:%M:%S')
+    def close_cursor(self, cursor):
+        pass
+
+    def close_statements(self):
+        pass
 
-        return self.select("SELECT id, facility_num, level_num, host, "\
-            "datetime, program, pid, message FROM logs WHERE datetime >= "\
-            "'{}' ORDER BY datetime ASC LIMIT 1".format(dt_str))
+    # every query is read to the end right away, so that no statement is left
+    # open between refills: an open SQLite statement keeps the syslog writer
+    # out of the database, an unread MySQL result blocks the connection
+    def _read_all(self, cmd, params, limit):
+        cursor = self.select(cmd, params)
+        try:
+            return self.fetch_rows(cursor, limit)
+        finally:
+            self.close_cursor(cursor)
+
+    def _get_id_range(self):
+        # MIN and MAX in one select make SQLite scan the table
+        rows = self._read_all("SELECT (SELECT MIN(id) FROM logs), "\
+            "(SELECT MAX(id) FROM logs)", (), 1)
+        if rows and not rows[0][0] is None:
+            return rows[0]
+
+    # a filter may match rows far apart, so a filtered stream reads one id
+    # window per statement instead of walking the table until LIMIT rows
+    # match; the window doubles each time it comes back short
+    def _start_scan(self, stream, count):
+        id_range = self._get_id_range()
+        if id_range is None:
+            stream.more = False
+            return
+        first, last = id_range
+        if stream.desc:
+            origin, stream.end = last + 1, first
+        else:
+            origin, stream.end = first - 1, last
+        if not stream.anchor is None:
+            origin = stream.anchor
+        stream.origin = stream.scanned = origin
+        stream.step = count * self.STREAM_FACTOR
+        stream.more = origin > first if stream.desc else origin < last
+
+    def _fill_scan(self, stream, count):
+        limit = count * self.STREAM_FACTOR
+        if stream.desc:
+            bound = max(stream.scanned - stream.step, stream.end)
+        else:
+            bound = min(stream.scanned + stream.step, stream.end)
+        rows = self._select_rows(self._get_statement(False, stream.desc, True),
+            self._get_params(stream.scanned, limit, bound), limit)
+        stream.rows.extend(rows)
+        if len(rows) == limit:
+            stream.scanned = rows[-1][0]
+            return
+        stream.scanned = bound
+        stream.step = min(stream.step * 2, self.MAX_SCAN_STEP)
+        stream.more = bound != stream.end
+
+    # rows with a new host or program only come at the end of the table, and
+    # only show up if the filter already knows their names
+    def _fill(self, stream, count):
+        if not self._hosts is None and not stream.desc and \
+                not (self._host is None and self._program is None):
+            self._refresh_dictionaries()
+        if stream.is_scan:
+            self._fill_scan(stream, count)
+            return
+        limit = count * self.STREAM_FACTOR
+        rows = self._select_rows(self._get_statement(stream.anchor is None,
+            stream.desc), self._get_params(stream.anchor, limit), limit)
+        stream.rows.extend(rows)
+        stream.more = len(rows) == limit
+
+    # a partial read runs at most one statement, so that a long scan returns
+    # what it has found so far
+    def _read(self, window, count, partial=False):
+        stream = window.stream
+        count = min(count, window.remaining)
+        result = []
+        filled = False
+        while len(result) < count:
+            if not stream.rows:
+                if not stream.more or partial and filled:
+                    break
+                self._fill(stream, count - len(result))
+                filled = True
+                continue
+            result.append(stream.rows.popleft())
+            stream.anchor = result[-1][0]
+        window.remaining -= len(result)
+        return result
+
+    def _probe(self, id):
+        rows = self._read_all("SELECT id, datetime FROM logs WHERE id >= {} "\
+            "ORDER BY id ASC LIMIT 1".format(self.PLACEHOLDER), (id, ), 1)
+        if rows:
+            return rows[0][0], self._parse_timestamp(rows[0][1])
+
+    # ids grow with time, so the first record of the start date is found by
+    # bisecting the id range with primary key lookups instead of scanning by
+    # datetime; gaps in the ids are skipped by probing for the next id. The
+    # filters are left to the queries continuing from the result
+    def seek_start_date(self):
+        id_range = self._get_id_range()
+        if id_range is None:
+            return None
+        start = ScreenBuffer.RecordBatch.to_timestamp(self._start_date)
+        lo, hi = id_range[0], id_range[1] + 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            id, timestamp = self._probe(mid)
+            if timestamp >= start:
+                hi = mid
+            else:
+                lo = id + 1
+        if lo > id_range[1]:
+            return None
+        return self._probe(lo)[0]
 
+    def _get_statement(self, from_start, desc, bounded=False):
+        key = (from_start, desc, bounded)
+        result = self._statements.get(key)
+        if result is None:
+            parts = [
+                "SELECT {}".format(self._get_columns()),
+                "FROM logs",
+                self._where(None if from_start else self._id_where(desc,
+                    bounded)),
+                self._order(desc),
+                self._limit()
+            ]
+            result = self._statements[key] = ' '.join(p for p in parts if p)
+        return result
+
+    def _get_params(self, start, count, bound=None):
+        params = [] if start is None else [start]
+        if not bound is None:
+            params.append(bound)
+        return tuple(params + self._filter_params + [count])
+
+    # every statement prepare_query may send with this filter, each with
+    # parameters to bind
+    def get_statements(self):
+        result = [(self._get_statement(from_start, desc),
+            self._get_params(None if from_start else 1, 1))
+            for from_start in (True, False) for desc in (True, False)]
+        if self.SCAN_WINDOWS and self._filter_conds:
+            result += [(self._get_statement(False, desc, True),
+                self._get_params(1, 1, 1)) for desc in (True, False)]
+        return result
+
+    # whether a filtered stream reads id windows instead of a single LIMIT
+    # statement
+    def _use_scan_windows(self):
+        return self.SCAN_WINDOWS and bool(self._filter_conds)
+
+    # a refill continuing where the previous one in the same direction ended
+    # reuses its stream; anything else, or a stream that has run dry, starts
+    # a new one
     def prepare_query(self, start, desc, count):
-        parts = [
-            "SELECT id, facility_num, level_num, host, datetime, program, pid, message",
-            "FROM logs",
-            self._where(self._id_where(start, desc)),
-            self._order(desc),
-            self._limit(count)
-        ]
-        return self.select(' '.join(p for p in parts if p))
+        stream = self._streams.get(desc)
+        if stream is None or stream.anchor != start or \
+                not (stream.rows or stream.more):
+            stream = self._streams[desc] = SQLDriver.Stream(desc, start)
+            if self._use_scan_windows():
+                self._start_scan(stream, count)
+            if stream.more:
+                self._fill(stream, count)
+        return SQLDriver.Window(stream, count)
+
+    # ids covered by a scan that may still find rows, and the ids it covers
+    # in all
+    def get_scan_progress(self, query):
+        stream = query.stream
+        if not stream.is_scan or query.remaining == 0 or \
+                not (stream.rows or stream.more):
+            return None
+        return abs(stream.scanned - stream.origin), \
+            abs(stream.end - stream.origin)
 
     def _build_one_filter(self, value):
         is_wildcard, is_negative = False, False
@@ -45,16 +312,21 @@ class SQLDriver(ScreenBuffer.Driver):
             is_negative = True
 
         if not is_wildcard and not is_negative:
-            return "= '{}'".format(value)
+            return "= {}".format(self.PLACEHOLDER), value
         elif not is_wildcard:
-            return "<> '{}'".format(value)
+            return "<> {}".format(self.PLACEHOLDER), value
         elif not is_negative:
-            return "LIKE '{}%'".format(value)
+            return "LIKE {}".format(self.PLACEHOLDER), value + '%'
         else:
-            return "NOT LIKE '{}%'".format(value)
+            return "NOT LIKE {}".format(self.PLACEHOLDER), value + '%'
 
-    def _get_separate_conditions(self, column, list):
-        return ["{} {}".format(column, self._build_one_filter(x)) for x in list]
+    def _get_separate_conditions(self, column, list, params):
+        result = []
+        for x in list:
+            cond, param = self._build_one_filter(x)
+            result.append("{} {}".format(column, cond))
+            params.append(param)
+        return result
 
     def _get_include_and_exclude_conditions(self, conditions):
         include = []
@@ -68,36 +340,86 @@ class SQLDriver(ScreenBuffer.Driver):
                 include.append(val)
         return (include, exclude)
 
-    def _get_string_condition(self, column, conditions):
+    def _get_string_condition(self, column, conditions, params):
         include, exclude = self._get_include_and_exclude_conditions(conditions)
         parts = []
         if include:
-            list = " OR ".join(self._get_separate_conditions(column, include))
+            list = " OR ".join(self._get_separate_conditions(column, include,
+                params))
             parts.append("({})".format(list))
-        parts += self._get_separate_conditions(column, exclude)
+        parts += self._get_separate_conditions(column, exclude, params)
         return " AND ".join(parts)
 
-    def _id_where(self, start, desc):
-        if start is None:
-            return
-        if desc:
-            fmt = 'id < {}'
-        else:
-            fmt = 'id > {}'
-        return fmt.format(start)
+    # a prefix is matched like SQLite's LIKE: '_' stands for any character,
+    # '%' for any sequence and only ASCII letters ignore case
+    def _like_pattern(self, value):
+        pattern = ''.join('.' if x == '_' else '.*' if x == '%' else
+            re.escape(x) for x in value)
+        return re.compile(pattern + '.*', re.ASCII | re.IGNORECASE | re.DOTALL)
 
-    def _where(self, id_where):
-        conds = []
-        if id_where:
-            conds.append(id_where)
+    def _match_name(self, name, value):
+        if len(value) > 1 and value.endswith('*'):
+            return not self._like_pattern(value[:-1]).fullmatch(name) is None
+        return name == value
+
+    def _get_ids(self, names, values):
+        return sorted(id for id, name in names.items() if not name is None and \
+            any(self._match_name(name, x) for x in values))
+
+    # with the dictionaries loaded the names are matched here, the same way
+    # SQLite would, and only the ids are sent; an IN (NULL) list
+    # matches nothing
+    def _get_id_condition(self, column, names, conditions, params):
+        include, exclude = self._get_include_and_exclude_conditions(conditions)
+        parts = []
+        if include:
+            ids = self._get_ids(names, include)
+            parts.append("{} IN ({})".format(column,
+                ', '.join([self.PLACEHOLDER] * len(ids)) or 'NULL'))
+            params.extend(ids)
+        ids = self._get_ids(names, [x[1:] for x in exclude])
+        if ids:
+            parts.append("{} NOT IN ({})".format(column,
+                ', '.join([self.PLACEHOLDER] * len(ids))))
+            params.extend(ids)
+        return " AND ".join(parts)
+
+    # the filter is turned into SQL once per driver; the values are passed as
+    # parameters, so the statement text is the same for every refill
+    def _compile_filter(self):
+        conds, params = [], []
         if not self._level is None:
-            conds.append('level_num <= {}'.format(self._level))
+            conds.append('level_num <= {}'.format(self.PLACEHOLDER))
+            params.append(self._level)
         if not self._facility is None:
-            conds.append('facility_num = {}'.format(self._facility))
-        if not self._host is None:
-            conds.append(self._get_string_condition('host', self._host))
-        if not self._program is None:
-            conds.append(self._get_string_condition('program', self._program))
+            conds.append('facility_num = {}'.format(self.PLACEHOLDER))
+            params.append(self._facility)
+        if not self._host is None and not self._hosts is None:
+            conds.append(self._get_id_condition('host_id', self._hosts,
+                self._host, params))
+        elif not self._host is None:
+            conds.append(self._get_string_condition('host', self._host, params))
+        if not self._program is None and not self._programs is None:
+            conds.append(self._get_id_condition('program_id', self._programs,
+                self._program, params))
+        elif not self._program is None:
+            conds.append(self._get_string_condition('program', self._program,
+                params))
+        return [x for x in conds if x], params
+
+    def _id_where(self, desc, bounded=False):
+        if bounded and desc:
+            return 'id < {0} AND id >= {0}'.format(self.PLACEHOLDER)
+        elif bounded:
+            return 'id > {0} AND id <= {0}'.format(self.PLACEHOLDER)
+        elif desc:
+            return 'id < {}'.format(self.PLACEHOLDER)
+        return 'id > {}'.format(self.PLACEHOLDER)
+
+    def _where(self, id_where):
+        conds = self._filter_conds
+        if id_where:
+            conds = [id_where] + conds
         if not conds:
             return
         return 'WHERE {}'.format(' AND '.join(conds))
@@ -107,5 +429,30 @@ class SQLDriver(ScreenBuffer.Driver):
             return 'ORDER BY id DESC'
         return 'ORDER BY id ASC'
 
-    def _limit(self, count):
-        return 'LIMIT {}'.format(count)
+    def _limit(self):
+        return 'LIMIT {}'.format(self.PLACEHOLDER)
+
+    def _parse_datetime(self, value):
+        return value
+
+    def _parse_timestamp(self, value):
+        return ScreenBuffer.RecordBatch.to_timestamp(self._parse_datetime(value))
+
+    def _make_record(self, row):
+        return ScreenBuffer.make_record(row[0], row[1], row[2], row[3],
+            self._parse_datetime(row[4]), row[5], row[6], row[7])
+
+    def fetch_record(self, query):
+        rows = self._read(query, 1)
+        if rows:
+            return self._make_record(rows[0])
+
+    def fetch_records(self, query, count):
+        return [self._make_record(row) for row in self._read(query, count)]
+
+    def fetch_batch(self, query, count):
+        result = ScreenBuffer.RecordBatch()
+        for row in self._read(query, count, True):
+            result.append(row[0], row[1], row[2], row[3],
+                self._parse_timestamp(row[4]), row[5], row[6], row[7])
+        return result
@@ -1,37 +1,185 @@
 import sqlite3
+import threading
 import datetime
+import urllib.parse
 
 from . import sql_driver
 from . import screen_buffer
+from . import sqlite3_indexer
 
 class SQLite3Driver(sql_driver.SQLDriver):
+    # a local query costs no round trip, and reading ahead only slows down
+    # filtered refills, so each query reads one refill
+    STREAM_FACTOR = 1
+    TEMP_STORES = ['default', 'file', 'memory']
+
+    # the options come as strings from the [sqlite3] section of the
+    # configuration; those left out keep the defaults below
     class Factory(object):
-        def __init__(self, filename):
+        def __init__(self, filename, mmap_size=None, cache_size=None,
+                temp_store=None, query_only=None):
             self._filename = filename
+            self._pragmas = dict(SQLite3Driver.PRAGMAS)
+            if not mmap_size is None:
+                self._pragmas['mmap_size'] = int(mmap_size)
+            if not cache_size is None:
+                self._pragmas['cache_size'] = int(cache_size)
+            if not temp_store is None:
+                if not temp_store in SQLite3Driver.TEMP_STORES:
+                    raise ValueError('Invalid temp_store `{}`'.format(temp_store))
+                self._pragmas['temp_store'] = temp_store
+            if not query_only is None:
+                self._pragmas['query_only'] = \
+                    int(query_only.lower() in ('1', 'yes', 'true', 'on'))
 
         def create_driver(self, state, start_date=None):
-            return SQLite3Driver(self._filename, level=state.level,
-                facility=state.facility, host=state.host, program=state.program,
-                start_date=start_date)
+            return SQLite3Driver(self._filename, pragmas=self._pragmas,
+                level=state.level, facility=state.facility, host=state.host,
+                program=state.program, start_date=start_date)
+
+        def create_indexer(self):
+            return sqlite3_indexer.SQLite3Indexer(self._filename)
+
+    # the viewer only reads, so the database is mapped into memory and
+    # temporary b-trees for sorting are kept off the disk
+    PRAGMAS = {
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -16 * 1024,
+        'temp_store': 'memory',
+        'query_only': 1,
+    }
 
-    def __init__(self, filename, **kwargs):
+    def __init__(self, filename, pragmas=None, **kwargs):
         sql_driver.SQLDriver.__init__(self, **kwargs)
         self._filename = filename
+        self._pragmas = pragmas if not pragmas is None else SQLite3Driver.PRAGMAS
+        self._connection = None
+        self._cancel_lock = threading.Lock()
+        self._journal_mode = None
+        self._scan_windows = None
+        self._days = dict()
+        self._offsets = dict()
+
+    def _same_database(self, other):
+        return self._filename == other._filename and \
+            self._pragmas == other._pragmas
+
+    def take_connection(self, other):
+        if not sql_driver.SQLDriver.take_connection(self, other):
+            return False
+        self._journal_mode = other._journal_mode
+        return True
 
+    @property
+    def journal_mode(self):
+        return self._journal_mode
+
+    # in WAL mode readers never block the syslog writer; with a rollback
+    # journal they do for as long as a statement is open
+    @property
+    def is_wal(self):
+        return self._journal_mode == 'wal'
+
+    # a read-only connection takes no reserved lock and can't create an
+    # empty database by mistake
     def start_connection(self):
-        self._connection = sqlite3.connect(self._filename)
+        self._connection = sqlite3.connect('file:{}?mode=ro'.format(
+            urllib.parse.quote(self._filename)), uri=True)
+        for name, value in sorted(self._pragmas.items()):
+            self._connection.execute('PRAGMA {} = {}'.format(name, value))
+        self._journal_mode = self._connection.execute(
+            'PRAGMA journal_mode').fetchone()[0]
+        self._connected()
+
+    def _has_dictionaries(self):
+        return self._connection.execute("SELECT COUNT(*) FROM sqlite_master "\
+            "WHERE type = 'table' AND name IN ('hosts', 'programs')").\
+            fetchone()[0] == 2
+
+    def use_dictionaries(self, hosts, programs):
+        sql_driver.SQLDriver.use_dictionaries(self, hosts, programs)
+        self._scan_windows = None
+
+    # an index that serves the filter returns the matching rows in id order,
+    # so one LIMIT statement reads only what it needs; windows are left to
+    # filters the planner can only answer by scanning the table
+    def _use_scan_windows(self):
+        if self._scan_windows is None:
+            self._scan_windows = sql_driver.SQLDriver._use_scan_windows(self) \
+                and not sqlite3_indexer.get_plan_indexes(self._connection,
+                    self._get_statement(False, True), self._get_params(1, 1))
+        return self._scan_windows
 
+    # cancel comes from another thread and may find the connection already
+    # closed by the worker; the lock keeps it from interrupting one mid-close
     def stop_connection(self):
-        self._connection.close()
-
-    def select(self, cmd):
-        return self._connection.execute(cmd)
-
-    def fetch_record(self, query):
-        rec = query.fetchone()
-        if rec is None:
-            return
-        dt = datetime.datetime.strptime(rec[4], '%Y-%m-%d %H:%M:%S')
-        return { 'id': rec[0], 'facility_num': str(rec[1]),
-            'level_num': str(rec[2]), 'host': rec[3], 'datetime': dt,
-            'program': rec[5], 'pid': rec[6], 'message': rec[7] }
+        with self._cancel_lock:
+            connection, self._connection = self._connection, None
+        connection.close()
+
+    def cancel(self):
+        with self._cancel_lock:
+            connection = self._connection
+            if connection:
+                try:
+                    connection.interrupt()
+                except sqlite3.ProgrammingError:
+                    pass
+
+    def _translate_error(self, e):
+        if str(e) == 'interrupted':
+            return screen_buffer.ScreenBuffer.Cancelled()
+        return e
+
+    def select(self, cmd, params=()):
+        try:
+            return self._connection.execute(cmd, params)
+        except sqlite3.OperationalError as e:
+            raise self._translate_error(e)
+
+    # Unix timestamps are shown in local time like the text ones; the UTC
+    # offset is looked up once per hour of timestamps
+    def _get_local_timestamp(self, value):
+        hour = value // 3600
+        offset = self._offsets.get(hour)
+        if offset is None:
+            offset = self._offsets[hour] = \
+                screen_buffer.ScreenBuffer.RecordBatch.to_timestamp(
+                    datetime.datetime.fromtimestamp(hour * 3600)) - hour * 3600
+        return value + offset
+
+    # 'YYYY-MM-DD HH:MM:SS' is read by slicing, with the seconds up to the
+    # start of each date kept
+    def _get_text_timestamp(self, value):
+        days = self._days.get(value[:10])
+        if days is None:
+            days = self._days[value[:10]] = \
+                screen_buffer.ScreenBuffer.RecordBatch.to_timestamp(
+                    datetime.datetime(int(value[:4]), int(value[5:7]),
+                        int(value[8:10])))
+        return days + int(value[11:13]) * 3600 + int(value[14:16]) * 60 + \
+            int(value[17:19])
+
+    # the datetime column holds either text in local time or, in newer
+    # schemas, an integer Unix timestamp; each value is read by its type
+    def _parse_timestamp(self, value):
+        if value is None:
+            return screen_buffer.ScreenBuffer.RecordBatch.NULL_TIMESTAMP
+        elif isinstance(value, int):
+            return self._get_local_timestamp(value)
+        return self._get_text_timestamp(value)
+
+    def _parse_datetime(self, value):
+        return screen_buffer.ScreenBuffer.RecordBatch.to_datetime(
+            self._parse_timestamp(value))
+
+    def close_cursor(self, cursor):
+        cursor.close()
+
+    def fetch_rows(self, query, count):
+        try:
+            if count is None:
+                return query.fetchall()
+            return query.fetchmany(count)
+        except sqlite3.OperationalError as e:
+            raise self._translate_error(e)
@@ -0,0 +1,132 @@
+import sqlite3
+import itertools
+
+from . import sql_driver
+
+# names of the indexes the plan of a statement uses; a statement that uses
+# none scans the table by id
+def get_plan_indexes(connection, cmd, params):
+    indexes = set()
+    for row in connection.execute('EXPLAIN QUERY PLAN ' + cmd, params):
+        detail = row[-1]
+        if ' INDEX ' in detail:
+            indexes.add(detail.split(' INDEX ')[1].split(' ')[0])
+    return indexes
+
+# secondary indexes for the filters SQLDriver sends. SQLite appends the rowid
+# to every index, so an index on a column compared with '=' also returns the
+# matching rows ordered by id and a refill reads only the rows it needs
+class SQLite3Indexer(object):
+    INDEXES = [
+        ('logs_facility_num', 'facility_num'),
+        ('logs_host', 'host'),
+        ('logs_program', 'program'),
+    ]
+
+    # a v2 database is filtered by host and program ids
+    V2_INDEXES = [
+        ('logs_facility_num', 'facility_num'),
+        ('logs_host_id', 'host_id'),
+        ('logs_program_id', 'program_id'),
+    ]
+
+    # sample values for each filter, one per kind of condition it may produce
+    FILTERS = [
+        ('level', [6]),
+        ('facility', [1]),
+        ('host', ['oasis', 'oasis*', '!oasis', 'oasis mirage']),
+        ('program', ['test', 'test*', '!test']),
+    ]
+
+    # the plan of one filter combination; 'indexes' are the indexes its
+    # statements use, a statement that uses none scans the table by id
+    class Plan(object):
+        def __init__(self, filter, indexes, scans):
+            self.filter = filter
+            self.indexes = indexes
+            self.scans = scans
+
+        def __str__(self):
+            desc = ' '.join('{}={}'.format(k, v) for k, v in self.filter)
+            if self.scans:
+                return '{}: scan'.format(desc)
+            return '{}: {}'.format(desc, ', '.join(sorted(self.indexes)))
+
+    def __init__(self, filename):
+        self._filename = filename
+
+    def _connect(self):
+        return sqlite3.connect(self._filename)
+
+    def get_journal_mode(self):
+        connection = self._connect()
+        try:
+            return connection.execute('PRAGMA journal_mode').fetchone()[0]
+        finally:
+            connection.close()
+
+    # the host and program dictionaries of a v2 database, None for the
+    # init-db.py layout
+    def _get_dictionaries(self, connection):
+        tables = set(row[0] for row in connection.execute("SELECT name FROM "\
+            "sqlite_master WHERE type = 'table'"))
+        if not {'hosts', 'programs'} <= tables:
+            return None
+        return [dict(connection.execute('SELECT id, name FROM {}'.format(x)))
+            for x in ('hosts', 'programs')]
+
+    def _get_index_names(self, connection):
+        return set(row[0] for row in connection.execute("SELECT name FROM "\
+            "sqlite_master WHERE type = 'index' AND tbl_name = 'logs'"))
+
+    # returns the names of the indexes created; the statistics ANALYZE
+    # gathers let the planner choose between them when several filters are set
+    def create_indexes(self):
+        connection = self._connect()
+        try:
+            existing = self._get_index_names(connection)
+            created = []
+            if self._get_dictionaries(connection) is None:
+                indexes = SQLite3Indexer.INDEXES
+            else:
+                indexes = SQLite3Indexer.V2_INDEXES
+            for name, columns in indexes:
+                if name in existing:
+                    continue
+                connection.execute('CREATE INDEX {} ON logs ({})'.format(name,
+                    columns))
+                created.append(name)
+            connection.execute('PRAGMA analysis_limit = 1000')
+            connection.execute('ANALYZE logs')
+            connection.commit()
+            return created
+        finally:
+            connection.close()
+
+    def _get_filters(self):
+        choices = [[None] + values for key, values in SQLite3Indexer.FILTERS]
+        for combination in itertools.product(*choices):
+            filter = [(key, value) for (key, values), value in
+                zip(SQLite3Indexer.FILTERS, combination) if not value is None]
+            if filter:
+                yield filter
+
+    # runs EXPLAIN QUERY PLAN on the statements of every filter combination
+    def check_query_plans(self):
+        connection = self._connect()
+        try:
+            result = []
+            dictionaries = self._get_dictionaries(connection)
+            for filter in self._get_filters():
+                driver = sql_driver.SQLDriver(**dict(filter))
+                if not dictionaries is None:
+                    driver.use_dictionaries(*dictionaries)
+                indexes, scans = set(), False
+                for cmd, params in driver.get_statements():
+                    used = get_plan_indexes(connection, cmd, params)
+                    indexes |= used
+                    scans = scans or not used
+                result.append(SQLite3Indexer.Plan(filter, indexes, scans))
+            return result
+        finally:
+            connection.close()
@@ -0,0 +1,38 @@
+import sqlite3
+
+# schema v2: host and program names are stored once in dictionary tables and
+# the datetime is an integer Unix timestamp
+V2_TABLES = [
+    'CREATE TABLE hosts (id INTEGER PRIMARY KEY, name TEXT UNIQUE)',
+    'CREATE TABLE programs (id INTEGER PRIMARY KEY, name TEXT UNIQUE)',
+    'CREATE TABLE logs (id INTEGER PRIMARY KEY AUTOINCREMENT, '\
+        'facility_num INTEGER, level_num INTEGER, '\
+        'host_id INTEGER REFERENCES hosts (id), datetime INTEGER, '\
+        'program_id INTEGER REFERENCES programs (id), pid TEXT, message TEXT)',
+]
+
+def create_v2_schema(connection):
+    for cmd in V2_TABLES:
+        connection.execute(cmd)
+
+# copies a database created by init-db.py into a new v2 one, keeping the ids;
+# the text datetimes are in local time, which the 'utc' modifier converts from
+def migrate_to_v2(source, target):
+    connection = sqlite3.connect(target)
+    try:
+        create_v2_schema(connection)
+        connection.execute('ATTACH DATABASE ? AS old', (source, ))
+        connection.execute('INSERT INTO hosts (name) SELECT DISTINCT host '\
+            'FROM old.logs WHERE host IS NOT NULL ORDER BY host')
+        connection.execute('INSERT INTO programs (name) SELECT DISTINCT '\
+            'program FROM old.logs WHERE program IS NOT NULL ORDER BY program')
+        connection.execute('INSERT INTO logs (id, facility_num, level_num, '\
+            'host_id, datetime, program_id, pid, message) SELECT l.id, '\
+            'l.facility_num, l.level_num, h.id, '\
+            "CAST(strftime('%s', l.datetime, 'utc') AS INTEGER), p.id, l.pid, "\
+            'l.message FROM old.logs l LEFT JOIN hosts h ON h.name = l.host '\
+            'LEFT JOIN programs p ON p.name = l.program ORDER BY l.id')
+        connection.commit()
+        connection.execute('DETACH DATABASE old')
+    finally:
+        connection.close()
@@ -12,11 +12,22 @@ class Base(object):
         self._window_manager = window_manager
         self._result = None
         self._closed = False
+        self._dirty = True
 
     @property
     def closed(self):
         return self._closed
 
+    @property
+    def dirty(self):
+        return self._dirty
+
+    def mark_dirty(self):
+        self._dirty = True
+
+    def mark_clean(self):
+        self._dirty = False
+
     @property
     def result(self):
         return self._result
@@ -63,6 +74,7 @@ class Log(Base):
         Base.__init__(self, window_manager)
 
         self._buf = buffer
+        self._drawn_version = None
 
         self._curses = window_manager.curses
         self._curses_window = window_manager.curses_window
@@ -79,6 +91,10 @@ class Log(Base):
 
         self._filter_state = window_states.Filter()
 
+        self._layout = [(self._pos(i), self._width(i))
+            for i in range(len(Log.WIDTHS) + 1)]
+        self._prefix_cache = dict()
+
         self._level_attrs = {
             'emerg':   self._curses.color_pair(1) | self._curses.A_REVERSE,
             'alert':   self._curses.color_pair(1) | self._curses.A_REVERSE,
@@ -102,29 +118,60 @@ class Log(Base):
         return Log.WIDTHS[i]
 
     def _update_line(self, y, p, val, attr=0):
-        self._pad.addnstr(y, self._pos(p), val, self._width(p), attr)
+        pos, width = self._layout[p]
+        self._pad.addnstr(y, pos, val, width, attr)
+
+    def _get_prefix(self, line, cache):
+        result = self._prefix_cache.get(line.id)
+        if result is None:
+            result = (datetime.datetime.strftime(line.datetime, '%m-%d %H:%M:%S'),
+                line.host, line.program, line.facility.upper(),
+                line.level.upper(), self._level_attrs.get(line.level, 0))
+        cache[line.id] = result
+        return result
+
+    @property
+    def dirty(self):
+        return self._dirty or self._buf.version != self._drawn_version
 
     def _get_filter_state_desc(self):
         return ' ' + '  '.join('{}: {}'.format(a, b) for (a, b) in \
             self._filter_state.get_summary()) + '  ' + 'Go to [d]ate'
 
+    # shown first, where a narrow terminal doesn't cut it off
+    def _get_scan_desc(self):
+        progress = self._buf.scan_progress
+        if not progress:
+            return ''
+        scanned, total = progress
+        return ' scanning: {} of {} ids ({}%) '.format(scanned, total,
+            100 * scanned // total if total else 100)
+
     def refresh(self):
         self._pad.erase()
 
+        # the version is read first, so a change racing with the redraw can
+        # only cause a spurious redraw later, never a missed one
+        self._drawn_version = self._buf.version
+        # formatted prefixes are cached by line id for the lines of the
+        # previous frame, which is usually all of them
+        cache = dict()
         for i, line in enumerate(self._buf.get_current_lines()):
             if not line.is_continuation or i == 0:
-                dt_str = datetime.datetime.strftime(line.datetime, '%m-%d %H:%M:%S')
+                dt_str, host, program, facility, level, level_attr = \
+                    self._get_prefix(line, cache)
                 self._update_line(i, 0, dt_str)
-                self._update_line(i, 1, line.host)
-                self._update_line(i, 2, line.program)
-                self._update_line(i, 3, line.facility.upper())
-                self._update_line(i, 4, line.level.upper(),
-                    self._level_attrs.get(line.level, 0))
+                self._update_line(i, 1, host)
+                self._update_line(i, 2, program)
+                self._update_line(i, 3, facility)
+                self._update_line(i, 4, level, level_attr)
             self._update_line(i, 5, line.message)
+        self._prefix_cache = cache
 
         y, x = self._curses_window.getmaxyx()
 
-        self._curses_window.addnstr(y - 1, 0, self._get_filter_state_desc(), x - 1)
+        self._curses_window.addnstr(y - 1, 0, self._get_scan_desc() +
+            self._get_filter_state_desc(), x - 1)
         self._curses_window.chgat(y - 1, 0, x, self._curses.A_BOLD | self._curses.A_REVERSE)
         self._curses_window.noutrefresh()
         self._pad.noutrefresh(0, self._pad_x, 0, 0, y - 2, x - 1)
@@ -0,0 +1,61 @@
+import os
+import time
+import unittest
+from unittest.mock import patch
+
+from logviewer.application import EventPoll
+
+class EventPollTest(unittest.TestCase):
+    class FakeStdin(object):
+        def __init__(self, fd):
+            self._fd = fd
+
+        def fileno(self):
+            return self._fd
+
+    def setUp(self):
+        self._stdin_r, self._stdin_w = os.pipe()
+        with patch('sys.stdin', EventPollTest.FakeStdin(self._stdin_r)):
+            self._poll = EventPoll()
+
+    def tearDown(self):
+        self._poll._poll.close()
+        for fd in [self._poll._r, self._poll._w, self._stdin_r, self._stdin_w]:
+            os.close(fd)
+
+    def test_should_time_out_without_events(self):
+        self.assertEqual(0, self._poll.wait(0.01))
+
+    def test_should_wait_for_timeout_in_seconds(self):
+        t = time.monotonic()
+
+        self.assertEqual(0, self._poll.wait(0.2))
+        self.assertGreaterEqual(time.monotonic() - t, 0.19)
+
+    def test_should_wake_up_on_notification(self):
+        self._poll.observer()
+
+        self.assertEqual(1, self._poll.wait(0.01))
+        self.assertEqual(0, self._poll.wait(0.01))
+
+    def test_should_coalesce_pending_notifications(self):
+        self._poll.observer()
+        self._poll.observer()
+        self._poll.observer()
+
+        self.assertEqual(2, self._poll.merged)
+        self.assertEqual(1, self._poll.wait(0.01))
+        self.assertEqual(0, self._poll.wait(0.01))
+
+    def test_should_notify_again_after_wake_up(self):
+        self._poll.observer()
+        self._poll.wait(0.01)
+        self._poll.observer()
+
+        self.assertEqual(0, self._poll.merged)
+        self.assertEqual(1, self._poll.wait(0.01))
+
+    def test_should_ignore_input_on_stdin(self):
+        os.write(self._stdin_w, b'x')
+
+        self.assertEqual(0, self._poll.wait(0.01))
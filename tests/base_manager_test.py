@@ -5,11 +5,12 @@ from logviewer.base_manager import *
 
 class BaseManagerTest(unittest.TestCase):
     class FakeManager(BaseManager):
-        def __init__(self, curses, curses_window):
-            BaseManager.__init__(self, curses, curses_window)
+        def __init__(self, curses, curses_window, max_fps=None):
+            BaseManager.__init__(self, curses, curses_window, max_fps)
+            self.timeouts = []
 
-        def wait(self):
-            pass
+        def wait(self, timeout=None):
+            self.timeouts.append(timeout)
 
     def _fake_getch(self):
         if self._getch_results:
@@ -50,6 +51,123 @@ class BaseManagerTest(unittest.TestCase):
         self._window.refresh.assert_called_once_with()
         second_window.refresh.assert_called_once_with()
 
+    def test_should_not_redraw_if_nothing_changed(self):
+        self._manager.stack.append(self._window)
+        self._window.dirty = False
+
+        self._manager.loop()
+        self._manager.loop()
+
+        self._window.refresh.assert_called_once_with()
+        self._curses_window.erase.assert_called_once_with()
+        self._curses.doupdate.assert_called_once_with()
+
+    def test_should_redraw_only_dirty_window_on_top(self):
+        self._manager.stack.append(self._window)
+        self._window.dirty = False
+
+        second_window = MagicMock()
+        second_window.dirty = False
+        self._manager.stack.append(second_window)
+
+        self._manager.loop()
+        second_window.dirty = True
+        self._manager.loop()
+
+        self._window.refresh.assert_called_once_with()
+        self.assertEqual(2, second_window.refresh.call_count)
+        self._curses_window.erase.assert_called_once_with()
+        self.assertEqual(2, self._curses.doupdate.call_count)
+
+    def test_should_redraw_windows_above_dirty_window(self):
+        self._manager.stack.append(self._window)
+        self._window.dirty = False
+
+        second_window = MagicMock()
+        second_window.dirty = False
+        self._manager.stack.append(second_window)
+
+        self._manager.loop()
+        self._window.dirty = True
+        self._manager.loop()
+
+        self.assertEqual(2, self._window.refresh.call_count)
+        self.assertEqual(2, second_window.refresh.call_count)
+        self.assertEqual(2, self._curses_window.erase.call_count)
+
+    def test_should_redraw_everything_if_stack_changes(self):
+        self._manager.stack.append(self._window)
+        self._window.dirty = False
+
+        self._manager.loop()
+        second_window = MagicMock()
+        self._manager.stack.append(second_window)
+        self._manager.loop()
+        self._manager.stack.pop()
+        self._manager.loop()
+
+        self.assertEqual(3, self._window.refresh.call_count)
+        self.assertEqual(3, self._curses_window.erase.call_count)
+
+    def test_should_mark_window_dirty_after_key(self):
+        self._manager.stack.append(self._window)
+
+        self._getch_results.append(ord('q'))
+        self._manager.loop()
+
+        self._window.mark_dirty.assert_called_once_with()
+
+    def test_should_redraw_everything_after_resize(self):
+        self._manager.stack.append(self._window)
+        self._window.dirty = False
+
+        self._curses_window.getmaxyx.return_value = (10, 20)
+        self._getch_results.append(curses.KEY_RESIZE)
+        self._manager.loop()
+        self._manager.loop()
+
+        self.assertEqual(2, self._window.refresh.call_count)
+
+    def test_should_defer_frame_until_next_frame_slot(self):
+        manager = BaseManagerTest.FakeManager(self._curses,
+            self._curses_window, max_fps=2)
+        manager.stack.append(self._window)
+
+        manager.loop()
+        manager.loop()
+
+        self._window.refresh.assert_called_once_with()
+        self.assertIsNone(manager.timeouts[0])
+        self.assertTrue(0 < manager.timeouts[1] <= 0.5)
+        self.assertEqual(1, manager.scheduler.frames)
+        self.assertEqual(1, manager.scheduler.deferred)
+
+    def test_should_handle_keys_while_frame_is_deferred(self):
+        manager = BaseManagerTest.FakeManager(self._curses,
+            self._curses_window, max_fps=2)
+        manager.stack.append(self._window)
+
+        manager.loop()
+        self._getch_results.append(ord('a'))
+        self._getch_results.append(ord('b'))
+        manager.loop()
+
+        self.assertEqual([((ord('a'),),), ((ord('b'),),)],
+            self._window.handle_key.call_args_list)
+        self._window.refresh.assert_called_once_with()
+
+    def test_should_not_wait_for_frame_slot_if_nothing_changed(self):
+        manager = BaseManagerTest.FakeManager(self._curses,
+            self._curses_window, max_fps=2)
+        manager.stack.append(self._window)
+        self._window.dirty = False
+
+        manager.loop()
+        manager.loop()
+
+        self.assertEqual([None, None], manager.timeouts)
+        self.assertEqual(0, manager.scheduler.deferred)
+
     def test_should_not_handle_null_key(self):
         self._manager.stack.append(self._window)
 
@@ -22,6 +22,32 @@ timeout = 2
         config = Configuration(self._conf_file, {})
         self.assertEqual(2, config.timeout)
 
+    def test_should_get_buffer_limits(self):
+        with open(self._conf_file, 'w+') as f:
+            f.write('''[main]
+max_lines = 100000
+max_bytes = 50000000
+''')
+        config = Configuration(self._conf_file, {})
+        self.assertEqual(100000, config.max_lines)
+        self.assertEqual(50000000, config.max_bytes)
+
+    def test_should_get_max_fps(self):
+        with open(self._conf_file, 'w+') as f:
+            f.write('''[main]
+max_fps = 10
+''')
+        config = Configuration(self._conf_file, {})
+        self.assertEqual(10, config.max_fps)
+
+    def test_should_disable_frame_rate_limit(self):
+        with open(self._conf_file, 'w+') as f:
+            f.write('''[main]
+max_fps = 0
+''')
+        config = Configuration(self._conf_file, {})
+        self.assertIsNone(config.max_fps)
+
     def test_should_get_driver_factory(self):
         with open(self._conf_file, 'w+') as f:
             f.write('''[main]
@@ -36,12 +62,32 @@ filename = test.db
         self.assertIsInstance(factory, sqlite3_driver.SQLite3Driver.Factory)
         self.assertEqual('test.db', factory._filename)
 
+    def test_should_pass_sqlite3_options_to_factory(self):
+        with open(self._conf_file, 'w+') as f:
+            f.write('''[main]
+backend = sqlite3
+
+[sqlite3]
+filename = test.db
+mmap_size = 1048576
+temp_store = file
+''')
+        config = Configuration(self._conf_file,
+            { 'sqlite3': sqlite3_driver.SQLite3Driver.Factory })
+        factory = config.get_factory()
+        self.assertEqual(1048576, factory._pragmas['mmap_size'])
+        self.assertEqual('file', factory._pragmas['temp_store'])
+        self.assertEqual(1, factory._pragmas['query_only'])
+
     def test_should_handle_default_config(self):
         with open(self._conf_file, 'w+') as f:
             f.write('[main]\n')
 
         config = Configuration(self._conf_file, {})
         self.assertIsNone(config.timeout)
+        self.assertIsNone(config.max_lines)
+        self.assertIsNone(config.max_bytes)
+        self.assertEqual(30, config.max_fps)
         self.assertRaises(Configuration.Error, config.get_factory)
 
     def test_should_fail_if_file_is_missing(self):
@@ -0,0 +1,197 @@
+import sys
+import types
+import unittest
+import threading
+from unittest.mock import MagicMock, patch
+
+# the driver is tested against a stand-in for mysql.connector when it is not
+# installed; only the names the driver uses are provided
+try:
+    import mysql.connector
+except ImportError:
+    class Error(Exception):
+        def __init__(self, msg=None, errno=None):
+            Exception.__init__(self, msg)
+            self.errno = errno
+
+    mysql = types.ModuleType('mysql')
+    mysql.connector = types.ModuleType('mysql.connector')
+    mysql.connector.Error = Error
+    mysql.connector.connect = None
+    mysql.connector.errorcode = types.ModuleType('mysql.connector.errorcode')
+    mysql.connector.errorcode.ER_QUERY_INTERRUPTED = 1317
+    sys.modules.update({ 'mysql': mysql, 'mysql.connector': mysql.connector,
+        'mysql.connector.errorcode': mysql.connector.errorcode })
+
+from mysql.connector import errorcode
+
+from logviewer.mysql_driver import MySQLDriver
+from logviewer.screen_buffer import ScreenBuffer
+
+class MySQLDriverTest(unittest.TestCase):
+    class FakeConnection(object):
+        def __init__(self, connection_id):
+            self.connection_id = connection_id
+            self.unread_result = False
+            self.cursors = []
+            self.rollback = MagicMock()
+            self.close = MagicMock()
+
+        def cursor(self, prepared=False):
+            result = MagicMock()
+            result.prepared = prepared
+            self.cursors.append(result)
+            return result
+
+    def setUp(self):
+        self._connections = []
+        patcher = patch.object(mysql.connector, 'connect', self._connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self._driver = MySQLDriver({ 'database': 'syslog' })
+        self._driver.start_connection()
+        self._connection = self._connections[0]
+
+    def _connect(self, **conf):
+        result = MySQLDriverTest.FakeConnection(len(self._connections) + 42)
+        self._connections.append(result)
+        return result
+
+    def test_should_reuse_prepared_cursor_for_statement(self):
+        cursor = self._driver.select('SELECT 1 FROM logs WHERE id > %s', (1, ))
+
+        self.assertIs(cursor, self._driver.select('SELECT 1 FROM logs WHERE '\
+            'id > %s', (2, )))
+        self.assertIsNot(cursor, self._driver.select('SELECT 2', ()))
+        self.assertEqual([True, True],
+            [x.prepared for x in self._connection.cursors])
+        self.assertEqual(2, cursor.execute.call_count)
+        cursor.execute.assert_called_with('SELECT 1 FROM logs WHERE id > %s',
+            (2, ))
+
+    def test_should_close_cursors_with_connection(self):
+        cursor = self._driver.select('SELECT 1', ())
+        self._driver.stop_connection()
+
+        cursor.close.assert_called_once_with()
+        self._connection.close.assert_called_once_with()
+
+    def test_should_read_unread_result_when_closing_cursor(self):
+        cursor = self._driver.select('SELECT 1', ())
+        self._connection.unread_result = True
+
+        self._driver.close_cursor(cursor)
+
+        cursor.fetchall.assert_called_once_with()
+        cursor.close.assert_not_called()
+        self._connection.rollback.assert_called_once_with()
+
+    def test_should_roll_back_read_result_when_closing_cursor(self):
+        cursor = self._driver.select('SELECT 1', ())
+
+        self._driver.close_cursor(cursor)
+
+        cursor.fetchall.assert_not_called()
+        self._connection.rollback.assert_called_once_with()
+
+    def test_should_read_query_to_end(self):
+        cursor = self._connection.cursor()
+        cursor.fetchmany.return_value = [(1, )]
+        self._connection.unread_result = True
+
+        with patch.object(self._connection, 'cursor', return_value=cursor):
+            self.assertEqual([(1, )], self._driver._read_all('SELECT 1', (), 1))
+        cursor.fetchmany.assert_called_once_with(1)
+        cursor.fetchall.assert_called_once_with()
+        self._connection.rollback.assert_called_once_with()
+
+    def test_should_translate_interrupted_query(self):
+        cursor = self._connection.cursor()
+        cursor.execute.side_effect = mysql.connector.Error(
+            errno=errorcode.ER_QUERY_INTERRUPTED)
+
+        with patch.object(self._connection, 'cursor', return_value=cursor):
+            self.assertRaises(ScreenBuffer.Cancelled, self._driver.select,
+                'SELECT 1', ())
+        self._connection.rollback.assert_called_once_with()
+
+    def test_should_pass_other_errors_on(self):
+        cursor = self._connection.cursor()
+        cursor.fetchmany.side_effect = mysql.connector.Error(errno=1146)
+
+        self.assertRaises(mysql.connector.Error, self._driver.fetch_rows,
+            cursor, 1)
+        self._connection.rollback.assert_not_called()
+
+    # runs a statement in another thread until 'release' is set
+    def _start_statement(self):
+        executing, release = threading.Event(), threading.Event()
+        cursor = self._connection.cursor()
+        cursor.execute.side_effect = \
+            lambda *args: executing.set() or release.wait(5.0)
+        thread = threading.Thread(target=self._driver.select,
+            args=('SELECT SLEEP(10)', ()))
+        with patch.object(self._connection, 'cursor', return_value=cursor):
+            thread.start()
+            executing.wait(5.0)
+        return thread, release
+
+    def test_should_kill_query_over_second_connection(self):
+        thread, release = self._start_statement()
+        self._driver.cancel()
+        self._driver._kill_thread.join()
+        release.set()
+        thread.join()
+
+        self.assertEqual(2, len(self._connections))
+        self._connections[1].cursors[0].execute.assert_called_once_with(
+            'KILL QUERY 42')
+        self._connections[1].close.assert_called_once_with()
+
+    def test_should_send_kill_before_handing_over_connection(self):
+        connecting, connected = threading.Event(), threading.Event()
+
+        def connect(**conf):
+            connecting.set()
+            connected.wait(5.0)
+            return self._connect(**conf)
+
+        thread, release = self._start_statement()
+        with patch.object(mysql.connector, 'connect', connect):
+            self._driver.cancel()
+            connecting.wait(5.0)
+            release.set()
+            thread.join()
+            driver = MySQLDriver({ 'database': 'syslog' })
+            taken = threading.Thread(target=driver.take_connection,
+                args=(self._driver, ))
+            taken.start()
+            taken.join(0.05)
+            self.assertTrue(taken.is_alive())
+
+            connected.set()
+            taken.join(5.0)
+
+        self._connections[1].cursors[0].execute.assert_called_once_with(
+            'KILL QUERY 42')
+        self.assertIs(self._connection, driver._connection)
+        self.assertIsNone(self._driver._connection)
+
+    def test_should_not_kill_idle_connection(self):
+        self._driver.select('SELECT 1', ())
+        self._driver.cancel()
+
+        self.assertIsNone(self._driver._kill_thread)
+        driver = MySQLDriver({ 'database': 'syslog' })
+        self.assertTrue(driver.take_connection(self._driver))
+        self.assertEqual(1, len(self._connections))
+
+    def test_should_not_kill_after_connection_was_handed_over(self):
+        driver = MySQLDriver({ 'database': 'syslog' })
+        self.assertTrue(driver.take_connection(self._driver))
+
+        self._driver.cancel()
+
+        self.assertIsNone(self._driver._kill_thread)
+        self.assertEqual(1, len(self._connections))
@@ -0,0 +1,105 @@
+import unittest
+
+from logviewer.read_ahead import ReadAhead
+
+class ReadAheadTest(unittest.TestCase):
+    def setUp(self):
+        self._now = 100.0
+
+    def _clock(self):
+        return self._now
+
+    def _create(self):
+        return ReadAhead(10, 50, 10, clock=self._clock)
+
+    def test_should_use_configured_sizes_without_measurements(self):
+        read_ahead = self._create()
+        read_ahead.scrolled(-10)
+        read_ahead.scrolled(-10)
+
+        self.assertEqual(50, read_ahead.get_size(True))
+        self.assertEqual(50, read_ahead.get_size(False))
+        self.assertEqual(10, read_ahead.get_threshold(True))
+        self.assertEqual(10, read_ahead.get_threshold(False))
+
+    def test_should_use_configured_sizes_without_scrolling(self):
+        read_ahead = self._create()
+        read_ahead.fetched(50, 0.5)
+
+        self.assertEqual(50, read_ahead.get_size(True))
+        self.assertEqual(50, read_ahead.get_size(False))
+
+    def test_should_measure_velocity_over_window(self):
+        read_ahead = self._create()
+        read_ahead.scrolled(-10)
+        self._now += 0.5
+        read_ahead.scrolled(-30)
+        self.assertEqual(-40.0, read_ahead.velocity)
+
+        self._now += 0.6
+        self.assertEqual(-30.0, read_ahead.velocity)
+        self._now += 0.5
+        self.assertEqual(0.0, read_ahead.velocity)
+
+    def test_should_grow_read_ahead_in_scroll_direction(self):
+        read_ahead = self._create()
+        read_ahead.fetched(50, 0.5)
+        for i in range(10):
+            read_ahead.scrolled(-10)
+
+        self.assertEqual(100, read_ahead.get_threshold(True))
+        self.assertEqual(200, read_ahead.get_size(True))
+        self.assertEqual(10, read_ahead.get_threshold(False))
+        self.assertEqual(12, read_ahead.get_size(False))
+
+    def test_should_not_shrink_below_page_size(self):
+        read_ahead = self._create()
+        read_ahead.fetched(50, 0.5)
+        read_ahead.scrolled(300)
+
+        self.assertEqual(10, read_ahead.get_size(True))
+
+    def test_should_limit_read_ahead(self):
+        read_ahead = self._create()
+        read_ahead.fetched(50, 10.0)
+        read_ahead.scrolled(-1000)
+
+        self.assertEqual(400, read_ahead.get_size(True))
+        self.assertEqual(400, read_ahead.get_threshold(True))
+
+    def test_should_smooth_latency(self):
+        read_ahead = self._create()
+        read_ahead.fetched(10, 1.0)
+        read_ahead.fetched(10, 2.0)
+        read_ahead.fetched(0, 0.0)
+
+        self.assertAlmostEqual(1.3, read_ahead.query_time)
+        self.assertAlmostEqual(0.13, read_ahead.record_time)
+
+    def test_should_fetch_page_sized_chunks_without_measurements(self):
+        read_ahead = self._create()
+
+        self.assertEqual(10, read_ahead.get_chunk_size(True, 50))
+        self.assertEqual(5, read_ahead.get_chunk_size(True, 5))
+
+    def test_should_size_chunks_from_record_latency(self):
+        read_ahead = self._create()
+
+        read_ahead.fetched(10, 0.02)
+        self.assertEqual(25, read_ahead.get_chunk_size(True, 50))
+
+        read_ahead = self._create()
+        read_ahead.fetched(10, 0.0001)
+        self.assertEqual(50, read_ahead.get_chunk_size(True, 50))
+
+        read_ahead = self._create()
+        read_ahead.fetched(10, 1.0)
+        self.assertEqual(10, read_ahead.get_chunk_size(True, 50))
+
+    def test_should_not_split_read_ahead_in_scroll_direction(self):
+        read_ahead = self._create()
+        read_ahead.fetched(10, 1.0)
+        read_ahead.scrolled(-10)
+
+        self.assertEqual(200, read_ahead.get_chunk_size(True, 200))
+        self.assertEqual(10, read_ahead.get_chunk_size(False, 200))
@@ -0,0 +1,48 @@
+import unittest
+
+from logviewer.render_scheduler import RenderScheduler
+
+class RenderSchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self._now = 100.0
+
+    def _clock(self):
+        return self._now
+
+    def test_should_render_first_frame_immediately(self):
+        scheduler = RenderScheduler(max_fps=10, clock=self._clock)
+        self.assertEqual(0.0, scheduler.get_delay())
+
+    def test_should_delay_frame_until_interval_elapses(self):
+        scheduler = RenderScheduler(max_fps=10, clock=self._clock)
+        scheduler.frame_rendered()
+
+        self._now += 0.04
+        self.assertAlmostEqual(0.06, scheduler.get_delay())
+        self._now += 0.06
+        self.assertEqual(0.0, scheduler.get_delay())
+
+    def test_should_not_delay_frames_without_limit(self):
+        scheduler = RenderScheduler(clock=self._clock)
+        scheduler.frame_rendered()
+        self.assertEqual(0.0, scheduler.get_delay())
+
+    def test_should_count_frames(self):
+        scheduler = RenderScheduler(max_fps=10, clock=self._clock)
+        scheduler.frame_rendered()
+        scheduler.frame_deferred()
+        scheduler.frame_deferred()
+        scheduler.frame_rendered()
+
+        self.assertEqual(2, scheduler.frames)
+        self.assertEqual(2, scheduler.deferred)
+
+    def test_should_count_events_merged_into_one_frame(self):
+        scheduler = RenderScheduler(max_fps=10, clock=self._clock)
+        scheduler.add_events(1)
+        scheduler.frame_rendered()
+        scheduler.add_events(3)
+        scheduler.add_events(2)
+        scheduler.frame_rendered()
+
+        self.assertEqual(4, scheduler.merged)
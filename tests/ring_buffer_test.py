@@ -0,0 +1,78 @@
+import unittest
+
+from logviewer.ring_buffer import RingBuffer
+
+class RingBufferTest(unittest.TestCase):
+    def test_should_create_empty_buffer(self):
+        buf = RingBuffer()
+        self.assertEqual(0, len(buf))
+        self.assertEqual([], buf[:])
+
+    def test_should_append_items(self):
+        buf = RingBuffer()
+        buf.append(1)
+        buf.append(2)
+        self.assertEqual([1, 2], list(buf))
+
+    def test_should_prepend_items(self):
+        buf = RingBuffer()
+        buf.appendleft(2)
+        buf.appendleft(1)
+        self.assertEqual([1, 2], list(buf))
+
+    def test_should_get_items_by_index(self):
+        buf = RingBuffer()
+        buf.append(2)
+        buf.appendleft(1)
+        buf.append(3)
+        self.assertEqual(1, buf[0])
+        self.assertEqual(3, buf[2])
+        self.assertEqual(3, buf[-1])
+        self.assertEqual(1, buf[-3])
+
+    def test_should_not_get_items_out_of_range(self):
+        buf = RingBuffer()
+        buf.append(1)
+        self.assertRaises(IndexError, buf.__getitem__, 1)
+        self.assertRaises(IndexError, buf.__getitem__, -2)
+
+    def test_should_grow_past_capacity(self):
+        buf = RingBuffer(capacity=4)
+        for i in range(5, 10):
+            buf.append(i)
+        for i in range(4, -1, -1):
+            buf.appendleft(i)
+        self.assertEqual(list(range(10)), list(buf))
+
+    def test_should_slice_wrapped_buffer(self):
+        buf = RingBuffer(capacity=8)
+        for i in range(4, 8):
+            buf.append(i)
+        for i in range(3, -1, -1):
+            buf.appendleft(i)
+        self.assertEqual([2, 3, 4, 5], buf[2:6])
+        self.assertEqual([6, 7], buf[6:10])
+        self.assertEqual([], buf[6:2])
+        self.assertEqual([0, 2, 4, 6], buf[::2])
+
+    def test_should_pop_items_from_both_ends(self):
+        buf = RingBuffer(capacity=4)
+        for i in range(4):
+            buf.appendleft(i)
+        self.assertEqual(3, buf.popleft())
+        self.assertEqual(0, buf.pop())
+        self.assertEqual([2, 1], list(buf))
+
+    def test_should_not_pop_from_empty_buffer(self):
+        buf = RingBuffer()
+        self.assertRaises(IndexError, buf.pop)
+        self.assertRaises(IndexError, buf.popleft)
+
+    def test_should_clear_buffer(self):
+        buf = RingBuffer(capacity=2)
+        for i in range(10):
+            buf.append(i)
+        buf.clear()
+        self.assertEqual(0, len(buf))
+        buf.appendleft(1)
+        self.assertEqual([1], buf[:])
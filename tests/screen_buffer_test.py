@@ -1,12 +1,15 @@
 import unittest
 import threading
 import random
+import time
 import datetime
 from unittest.mock import Mock, MagicMock, patch
 
 from logviewer.screen_buffer import ScreenBuffer
 
 class ScreenBufferTest(unittest.TestCase):
+    DATETIME = datetime.datetime(2016, 5, 22, 23, 0, 0)
+
     class Queue(object):
         def __init__(self):
             self._sem = threading.Semaphore(0)
@@ -38,6 +41,16 @@ class ScreenBufferTest(unittest.TestCase):
                 self.push(x)
             self.push(None)
 
+        def discard_end(self):
+            if not self._sem.acquire(blocking=False):
+                return
+            with self._lock:
+                if self._list[-1] is None:
+                    self._list.pop()
+                    self._cv.notify()
+                    return
+            self._sem.release()
+
         def is_empty(self):
             with self._lock:
                 return len(self._list) == 0
@@ -72,6 +85,7 @@ class ScreenBufferTest(unittest.TestCase):
             self.error = False
             self.dt = None
             self.instruction = None
+            self.limit = None
 
         def has_start_date(self):
             return not (not self.start_date)
@@ -84,31 +98,120 @@ class ScreenBufferTest(unittest.TestCase):
 
         def prepare_datetime_query(self):
             self.dt = self.start_date
+            self.limit = None
             return self.magic
 
         def prepare_query(self, start, desc, count):
             self.instruction = (start, desc, count)
+            self.limit = count
             return self.magic
 
+        # a query ends after 'limit' records or at a None in the queue; a None
+        # right after the last record allowed by the limit is consumed too
         def fetch_record(self, query):
             if query != self.magic:
                 self.error = True
+            if self.limit == 0:
+                return None
             i = self.queue.pop()
+            if not self.limit is None:
+                self.limit -= 1
+                if self.limit == 0:
+                    self.queue.discard_end()
             if i is None:
                 return None
-            result = { 'id': i, 'datetime': '2016-05-22 23:00:00',
-                'host': 'test', 'program': 'test', 'facility_num': 1,
-                'level_num': 6, 'message': str(i) }
-            return result
+            return ScreenBuffer.Record(i, 1, 6, 'test', ScreenBufferTest.DATETIME,
+                'test', '100', str(i))
+
+    class BlockingDriver(FakeDriver):
+        def __init__(self, queue, honour_cancel=True):
+            ScreenBufferTest.FakeDriver.__init__(self, queue)
+            self.fetching = threading.Event()
+            self.cancelled = threading.Event()
+            self.release = threading.Event()
+            self.honour_cancel = honour_cancel
+
+        def cancel(self):
+            self.cancelled.set()
+            if self.honour_cancel:
+                self.release.set()
+
+        def fetch_record(self, query):
+            self.fetching.set()
+            self.release.wait(5.0)
+            if self.honour_cancel and self.cancelled.is_set():
+                raise ScreenBuffer.Cancelled()
+            return ScreenBufferTest.FakeDriver.fetch_record(self, query)
+
+    class RangeDriver(ScreenBuffer.Driver):
+        def __init__(self, first, last, on_query=None):
+            self.first, self.last = first, last
+            self.on_query = on_query
+            self.queries = []
+
+        def has_start_date(self):
+            return False
+
+        def prepare_query(self, start, desc, count):
+            self.queries.append((start, desc, count))
+            if self.on_query:
+                self.on_query(len(self.queries))
+            if desc:
+                ids = range(start - 1 if start else self.last, self.first - 1, -1)
+            else:
+                ids = range(start + 1, self.last + 1)
+            return iter(ids[:count])
+
+        def fetch_record(self, query):
+            i = next(query, None)
+            if not i is None:
+                return ScreenBuffer.Record(i, 1, 6, 'test',
+                    ScreenBufferTest.DATETIME, 'test', '100', str(i))
+
+    # matching ids are found scanning 'window' ids per fetch, from the end
+    # of the table down
+    class ScanDriver(ScreenBuffer.Driver):
+        class Query(object):
+            def __init__(self, pos, count):
+                self.pos = pos
+                self.count = count
+
+        def __init__(self, last, matching, window, on_fetch=None):
+            self.last = last
+            self.matching = matching
+            self.window = window
+            self.on_fetch = on_fetch
+
+        def has_start_date(self):
+            return False
+
+        def prepare_query(self, start, desc, count):
+            return ScreenBufferTest.ScanDriver.Query(start or self.last + 1,
+                count)
+
+        def fetch_batch(self, query, count):
+            if self.on_fetch:
+                self.on_fetch()
+            bound = max(query.pos - self.window, 1)
+            ids = [i for i in range(query.pos - 1, bound - 1, -1)
+                if i in self.matching][:count]
+            query.pos = ids[-1] if len(ids) == count else bound
+            query.count -= len(ids)
+            return ScreenBuffer.RecordBatch.from_records(
+                ScreenBuffer.Record(i, 1, 6, 'test', ScreenBufferTest.DATETIME,
+                    'test', '100', str(i)) for i in ids)
+
+        def get_scan_progress(self, query):
+            if query.count > 0 and query.pos > 1:
+                return self.last + 1 - query.pos, self.last
 
     class NullDriver(object):
         def has_start_date(self):
             return False
 
     def _get_line(self, i, message=None):
-        return { 'id': i, 'datetime': '2016-05-22 23:00:00', 'host': 'test',
-            'program': 'test', 'facility_num': 1, 'level_num': 6,
-            'message': message is None and str(i) or message }
+        return ScreenBuffer.Record(i, 1, 6, 'test', ScreenBufferTest.DATETIME,
+            'test', '100', message is None and str(i) or message)
 
     def setUp(self):
         self.observer = ScreenBufferTest.Observer()
@@ -118,29 +221,36 @@ class ScreenBufferTest(unittest.TestCase):
         self.assertTrue(self.queue.is_empty())
 
     def test_should_translate_integers_to_description(self):
-        line = ScreenBuffer.Line({ 'id': 1, 'datetime': '', 'host': '',
-            'program': '', 'message': '', 'facility_num': 1, 'level_num': 6 }, False)
-        self.assertEqual('user', line.facility)
-        self.assertEqual('info', line.level)
-
-    def test_should_translate_strings_to_description(self):
-        line = ScreenBuffer.Line({ 'id': 1, 'datetime': '', 'host': '',
-            'program': '', 'message': '', 'facility_num': '1', 'level_num': '6' }, False)
+        line = ScreenBuffer.Line(ScreenBuffer.Record(1, 1, 6, '', '', '', '',
+            ''), False)
         self.assertEqual('user', line.facility)
         self.assertEqual('info', line.level)
 
     def test_should_translate_out_of_range_values_to_blank(self):
-        line = ScreenBuffer.Line({ 'id': 1, 'datetime': '', 'host': '',
-            'program': '', 'message': '', 'facility_num': 24, 'level_num': 8 }, False)
+        line = ScreenBuffer.Line(ScreenBuffer.Record(1, 24, 8, '', '', '', '',
+            ''), False)
         self.assertEqual('', line.facility)
         self.assertEqual('', line.level)
 
-    def test_should_translate_invalid_integers_to_blank(self):
-        line = ScreenBuffer.Line({ 'id': 1, 'datetime': '', 'host': '',
-            'program': '', 'message': '', 'facility_num': 'a', 'level_num': 'b' }, False)
+    def test_should_translate_missing_values_to_blank(self):
+        line = ScreenBuffer.Line(ScreenBuffer.Record(1, None, None, '', '', '',
+            '', ''), False)
         self.assertEqual('', line.facility)
         self.assertEqual('', line.level)
 
+    def test_should_not_have_instance_dict_in_line(self):
+        line = ScreenBuffer.Line(self._get_line(1), False)
+        self.assertFalse(hasattr(line, '__dict__'))
+
+    def test_should_share_host_and_program_strings_between_records(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+
+        buf.append_records(self._get_line(i)._replace(host=''.join(['ho', 'st']),
+            program=''.join(['pro', 'gram'])) for i in range(1, 3))
+        cur = buf.get_current_lines()
+        self.assertIs(cur[0].host, cur[1].host)
+        self.assertIs(cur[0].program, cur[1].program)
+
     def test_should_initialize_screen_buffer_with_defaults(self):
         buf = ScreenBuffer(page_size=10)
 
@@ -321,6 +431,142 @@ class ScreenBufferTest(unittest.TestCase):
         self.assertEqual('a', cur[0].message)
         self.assertEqual('b', cur[1].message)
 
+    def test_should_prepend_batch_of_records_with_single_notification(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+        buf.add_observer(self.observer.notify)
+
+        buf.prepend_records(self._get_line(i) for i in range(5, 0, -1))
+        self.assertEqual(1, self.observer.count)
+
+        cur = buf.get_current_lines()
+        self.assertEqual(2, len(cur))
+        self.assertEqual('4', cur[0].message)
+        self.assertEqual('5', cur[1].message)
+        buf.go_to_previous_page()
+        buf.go_to_previous_page()
+        self.assertEqual('1', buf.get_current_lines()[0].message)
+
+    def test_should_append_batch_of_records_with_single_notification(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+        buf.add_observer(self.observer.notify)
+
+        buf.append_records(self._get_line(i) for i in range(1, 6))
+        self.assertEqual(1, self.observer.count)
+
+        cur = buf.get_current_lines()
+        self.assertEqual(2, len(cur))
+        self.assertEqual('4', cur[0].message)
+        self.assertEqual('5', cur[1].message)
+
+    def test_should_not_notify_empty_batch(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+        buf.add_observer(self.observer.notify)
+
+        buf.append_records([])
+        buf.prepend_records([])
+        self.assertEqual(0, self.observer.count)
+
+    def test_should_notify_once_per_fetched_chunk(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+        buf.add_observer(self.observer.notify)
+
+        self.queue.push_backward_records(7, 7)
+        buf.get_records(ScreenBufferTest.FakeDriver(self.queue))
+        self.assertEqual(1, self.observer.count)
+
+    def test_should_build_lines_only_for_current_page(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+
+        with patch.object(ScreenBuffer, 'Line', wraps=ScreenBuffer.Line) as line:
+            buf.append_records(self._get_line(i) for i in range(1, 11))
+            self.assertEqual(0, line.call_count)
+            buf.get_current_lines()
+            self.assertEqual(2, line.call_count)
+
+    def test_should_reuse_lines_built_for_previous_page(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+
+        buf.append_records(self._get_line(i) for i in range(1, 11))
+        cur = buf.get_current_lines()
+        buf.go_to_previous_line()
+        self.assertIs(cur[0], buf.get_current_lines()[1])
+
+    def test_should_change_version_if_visible_lines_change(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+
+        v = buf.version
+        buf.append_records(self._get_line(i) for i in range(1, 6))
+        self.assertNotEqual(v, buf.version)
+
+        v = buf.version
+        buf.go_to_previous_line()
+        self.assertNotEqual(v, buf.version)
+
+        v = buf.version
+        buf.page_size = 3
+        self.assertNotEqual(v, buf.version)
+
+        v = buf.version
+        buf.clear()
+        self.assertNotEqual(v, buf.version)
+
+    def test_should_not_change_version_if_visible_lines_do_not_change(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+
+        buf.append_records(self._get_line(i) for i in range(2, 6))
+        buf.go_to_previous_line()
+
+        v = buf.version
+        buf.prepend_record(self._get_line(1))
+        buf.append_record(self._get_line(6))
+        self.assertEqual(v, buf.version)
+
+        buf.go_to_next_page()
+        buf.go_to_next_page()
+        v = buf.version
+        buf.go_to_next_line()
+        self.assertEqual(v, buf.version)
+
+    def test_should_keep_published_snapshot_unchanged(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+
+        buf.append_records(self._get_line(i) for i in range(1, 4))
+        snapshot = buf.snapshot
+        buf.append_records(self._get_line(i) for i in range(4, 6))
+        buf.page_size = 3
+
+        self.assertEqual(2, snapshot.page_size)
+        self.assertEqual(3, snapshot.lines)
+        self.assertEqual([2, 3], [buf._get_id(x) for x in snapshot.entries])
+        self.assertEqual(3, buf.snapshot.page_size)
+        self.assertEqual(5, buf.snapshot.lines)
+        self.assertNotEqual(snapshot.version, buf.version)
+
+    def test_should_add_and_remove_observers_while_notifying(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+        errors = []
+
+        def churn():
+            try:
+                for i in range(2000):
+                    observer = ScreenBufferTest.Observer()
+                    buf.add_observer(observer.notify)
+                    buf.remove_observer(observer.notify)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=churn) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for i in range(2000):
+            buf.append_record(self._get_line(i))
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([], errors)
+        self.assertEqual(frozenset(), buf._observers)
+        self.assertRaises(KeyError, buf.remove_observer, self.observer.notify)
+
     def test_should_stop_observing(self):
         buf = ScreenBuffer(page_size=2, buffer_size=5)
 
@@ -428,6 +674,154 @@ class ScreenBufferTest(unittest.TestCase):
         self.assertEqual(3, len(cur))
         self.assertEqual('7', cur[0].message)
 
+    def test_should_evict_oldest_records_when_tailing(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5, max_lines=12)
+        buf._bottom_seen = True
+
+        for i in range(20):
+            buf.append_record(self._get_line(i + 1))
+
+        self.assertEqual(12, buf.footprint[0])
+        self.assertFalse(buf._bottom_seen)
+        cur = buf.get_current_lines()
+        self.assertEqual('19', cur[0].message)
+        self.assertEqual('20', cur[1].message)
+        self.assertEqual(((20, False, 5),),
+            buf.get_buffer_instructions(ScreenBufferTest.NullDriver()))
+
+    def test_should_evict_newest_records_when_scrolling_back(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5, max_lines=20)
+
+        for i in range(30, 10, -1):
+            buf.prepend_record(self._get_line(i))
+        for i in range(10):
+            buf.go_to_previous_page()
+        for i in range(10, 0, -1):
+            buf.prepend_record(self._get_line(i))
+
+        self.assertEqual(20, buf.footprint[0])
+        cur = buf.get_current_lines()
+        self.assertEqual('11', cur[0].message)
+        self.assertEqual('12', cur[1].message)
+
+        for i in range(10):
+            buf.go_to_next_page()
+        self.assertEqual(((21, False, 5),),
+            buf.get_buffer_instructions(ScreenBufferTest.NullDriver()))
+
+    def test_should_not_evict_below_refill_threshold(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5, max_lines=3)
+
+        for i in range(12):
+            buf.append_record(self._get_line(i + 1))
+
+        self.assertEqual(9, buf.footprint[0])
+
+    def test_should_evict_multi_line_records_as_a_whole(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5, max_lines=10)
+
+        buf.append_record(self._get_line(1, 'a\nb\nc'))
+        for i in range(1, 10):
+            buf.append_record(self._get_line(i + 1))
+
+        self.assertEqual(9, buf.footprint[0])
+        for i in range(5):
+            buf.go_to_previous_page()
+        self.assertEqual(((2, True, 5),),
+            buf.get_buffer_instructions(ScreenBufferTest.NullDriver()))
+
+    # one batch per record and no batch overhead, so that each line frees
+    # its own size
+    def _unmerged(self):
+        return patch.multiple(ScreenBuffer, MERGE_ROWS=1, BATCH_OVERHEAD=0)
+
+    def test_should_evict_by_size(self):
+        size = ScreenBuffer.LINE_OVERHEAD + 10
+        buf = ScreenBuffer(page_size=2, buffer_size=5, max_bytes=size * 10)
+
+        with self._unmerged():
+            for i in range(20):
+                buf.append_record(self._get_line(i + 1, '{:02}'.format(i)))
+
+        self.assertEqual((10, size * 10), buf.footprint)
+
+    def test_should_count_batch_until_all_its_lines_are_evicted(self):
+        size = ScreenBuffer.LINE_OVERHEAD + 10
+        buf = ScreenBuffer(page_size=2, buffer_size=5, max_bytes=size * 12)
+
+        with self._unmerged():
+            buf.append_batch(ScreenBuffer.RecordBatch.from_records(
+                [self._get_line(i + 1, '{:02}'.format(i)) for i in range(10)]))
+            for i in range(10, 20):
+                buf.append_record(self._get_line(i + 1, '{:02}'.format(i)))
+
+        self.assertEqual((10, size * 10), buf.footprint)
+        self.assertEqual(20, buf.get_current_lines()[1].id)
+
+    def test_should_keep_read_ahead_margins_below_size_limit(self):
+        size = ScreenBuffer.LINE_OVERHEAD + 10
+        buf = ScreenBuffer(page_size=2, buffer_size=5, max_bytes=size)
+
+        with self._unmerged():
+            for i in range(20):
+                buf.append_record(self._get_line(i + 1, '{:02}'.format(i)))
+
+        self.assertEqual((9, size * 9), buf.footprint)
+        self.assertEqual(((20, False, 5),),
+            buf.get_buffer_instructions(ScreenBufferTest.NullDriver()))
+
+    def test_should_reset_footprint_on_clear(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+
+        buf.append_record(self._get_line(1, 'ab'))
+        self.assertEqual((1, ScreenBuffer.BATCH_OVERHEAD +
+            ScreenBuffer.LINE_OVERHEAD + 10), buf.footprint)
+        buf.clear()
+        self.assertEqual((0, 0), buf.footprint)
+
+    def test_should_merge_small_inserts_into_open_batch(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+
+        for i in range(3):
+            buf.append_record(self._get_line(i + 1, 'ab'))
+        buf.append_batch(ScreenBuffer.RecordBatch.from_records(
+            [self._get_line(4, 'ab')]))
+
+        self.assertEqual(1, len(set(x[0] for x in buf._lines)))
+        self.assertEqual((4, ScreenBuffer.BATCH_OVERHEAD +
+            4 * (ScreenBuffer.LINE_OVERHEAD + 10)), buf.footprint)
+        self.assertEqual(['3', '4'], [str(x.id) for x in buf.get_current_lines()])
+
+    def test_should_keep_separate_open_batches_for_both_sides(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+
+        buf.append_record(self._get_line(2))
+        buf.prepend_record(self._get_line(1))
+        buf.append_record(self._get_line(3))
+
+        self.assertIsNot(buf._lines[0][0], buf._lines[1][0])
+        self.assertIs(buf._lines[1][0], buf._lines[2][0])
+        self.assertEqual([1, 2, 3], [buf._get_id(x) for x in buf._lines])
+
+    def test_should_start_new_open_batch_when_full(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+
+        with patch.object(ScreenBuffer, 'MERGE_ROWS', 2):
+            buf.append_records([self._get_line(i + 1, 'ab') for i in range(3)])
+
+        self.assertEqual([2, 2, 1], [len(x[0]) for x in buf._lines])
+        self.assertEqual((3, 2 * ScreenBuffer.BATCH_OVERHEAD +
+            3 * (ScreenBuffer.LINE_OVERHEAD + 10)), buf.footprint)
+
+    def test_should_keep_large_batch_as_is(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+        batch = ScreenBuffer.RecordBatch.from_records([self._get_line(i + 1)
+            for i in range(ScreenBuffer.MERGE_ROWS)])
+
+        buf.append_batch(batch)
+
+        self.assertTrue(all(x[0] is batch for x in buf._lines))
+
     def test_should_get_buffer_instructions_for_empty_buffer(self):
         buf = ScreenBuffer(page_size=2, buffer_size=5)
 
@@ -487,6 +881,37 @@ class ScreenBufferTest(unittest.TestCase):
         self.assertEqual(((12, False, 5), (11, True, 5)),
             buf.get_buffer_instructions(ScreenBufferTest.NullDriver()))
 
+    def test_should_get_buffer_instructions_closer_to_page_first(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5, low_buffer_threshold=8)
+
+        buf.append_records(self._get_line(i) for i in range(11, 21))
+        buf.go_to_previous_page()
+        buf.go_to_previous_page()
+        buf.go_to_previous_page()
+        buf.go_to_previous_line()
+
+        self.assertEqual(((11, True, 5), (20, False, 5)),
+            buf.get_buffer_instructions(ScreenBufferTest.NullDriver()))
+
+    def test_should_read_ahead_further_in_scroll_direction(self):
+        now = [100.0]
+        buf = ScreenBuffer(page_size=2, buffer_size=5, clock=lambda: now[0])
+        drv = ScreenBufferTest.RangeDriver(1, 1000)
+
+        def on_query(n):
+            now[0] += 0.5
+        drv.on_query = on_query
+
+        buf.append_records(self._get_line(i) for i in range(981, 1001))
+        buf.get_records(drv)
+        for i in range(5):
+            buf.go_to_previous_page()
+
+        self.assertEqual(((981, True, 20),), buf.get_buffer_instructions(drv))
+
+        now[0] += 2.0
+        self.assertEqual((), buf.get_buffer_instructions(drv))
+
     def test_should_get_buffer_instructions_for_given_date(self):
         dt = datetime.datetime.utcnow()
         buf = ScreenBuffer(page_size=2, buffer_size=5)
@@ -507,6 +932,34 @@ class ScreenBufferTest(unittest.TestCase):
 
         self.assertEqual(((None, True, 7),), buf.get_buffer_instructions(drv))
 
+    def test_should_not_hold_lock_while_driver_is_busy(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+        busy, done = threading.Event(), threading.Event()
+
+        class SlowDriver(ScreenBufferTest.FakeDriver):
+            def prepare_datetime_query(self):
+                busy.set()
+                done.wait(2.0)
+                return ScreenBufferTest.FakeDriver.prepare_datetime_query(self)
+
+        self.queue.push(None)
+        drv = SlowDriver(self.queue, datetime.datetime.utcnow())
+        thread = threading.Thread(target=buf.get_buffer_instructions, args=(drv,))
+        thread.start()
+        try:
+            busy.wait(2.0)
+            max_wait = 0.0
+            for i in range(20):
+                t = time.perf_counter()
+                buf.get_current_lines()
+                buf.page_size = 2
+                max_wait = max(max_wait, time.perf_counter() - t)
+                time.sleep(0.005)
+        finally:
+            done.set()
+            thread.join()
+        self.assertLess(max_wait, 0.05)
+
     def test_should_start_and_stop_driver(self):
         buf = ScreenBuffer(page_size=2, buffer_size=5)
 
@@ -543,6 +996,166 @@ class ScreenBufferTest(unittest.TestCase):
 
         buf.stop()
 
+    def test_should_keep_worker_and_connection_on_restart(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+
+        class SharingDriver(ScreenBufferTest.FakeDriver):
+            def take_connection(self, other):
+                self.taken = other
+                return True
+
+        drv = ScreenBufferTest.FakeDriver(self.queue)
+        buf.start(drv)
+        self.queue.push_backward_records(2, 2)
+        self.queue.wait()
+        thread = buf._thread
+
+        queue2 = ScreenBufferTest.Queue()
+        drv2 = SharingDriver(queue2)
+        buf.restart(drv2)
+        queue2.push_backward_records(3, 3)
+        queue2.wait()
+
+        try:
+            self.assertIs(thread, buf._thread)
+            self.assertIs(drv, drv2.taken)
+            self.assertFalse(drv.stopped)
+            self.assertFalse(drv2.started.is_set())
+            self.assertEqual(['2', '3'],
+                [x.message for x in buf.get_current_lines()])
+        finally:
+            buf.stop()
+        self.assertTrue(drv2.stopped)
+
+    def test_should_reconnect_on_restart_if_connection_cannot_be_taken(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+
+        drv = ScreenBufferTest.FakeDriver(self.queue)
+        buf.start(drv)
+        self.queue.push(None)
+        self.queue.wait()
+
+        queue2 = ScreenBufferTest.Queue()
+        drv2 = ScreenBufferTest.FakeDriver(queue2)
+        buf.restart(drv2)
+        queue2.push_none_and_wait()
+
+        try:
+            self.assertTrue(drv.stopped)
+            self.assertTrue(drv2.started.is_set())
+        finally:
+            buf.stop()
+
+    def test_should_cancel_query_on_stop(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+
+        drv = ScreenBufferTest.BlockingDriver(self.queue)
+        buf.start(drv)
+        drv.fetching.wait()
+        t = time.perf_counter()
+        buf.stop()
+
+        self.assertLess(time.perf_counter() - t, 0.5)
+        self.assertTrue(drv.cancelled.is_set())
+        self.assertTrue(drv.stopped)
+
+    def test_should_not_wait_for_worker_ignoring_cancel(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+
+        drv = ScreenBufferTest.BlockingDriver(self.queue, honour_cancel=False)
+        buf.start(drv)
+        drv.fetching.wait()
+        thread = buf._thread
+        with patch.object(ScreenBuffer, 'JOIN_TIMEOUT', 0.05):
+            buf.stop()
+        self.assertTrue(thread.is_alive())
+
+        self.queue.push_backward_records(1, 1)
+        drv.release.set()
+        thread.join()
+        self.assertEqual(0, len(buf.get_current_lines()))
+        self.assertTrue(drv.stopped)
+
+    def test_should_cancel_query_on_restart(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+
+        drv = ScreenBufferTest.BlockingDriver(self.queue)
+        buf.start(drv)
+        drv.fetching.wait()
+
+        queue2 = ScreenBufferTest.Queue()
+        drv2 = ScreenBufferTest.FakeDriver(queue2)
+        buf.restart(drv2)
+        queue2.push_backward_records(2, 2)
+        queue2.wait()
+
+        try:
+            self.assertTrue(drv.cancelled.is_set())
+            self.assertEqual(['1', '2'],
+                [x.message for x in buf.get_current_lines()])
+        finally:
+            buf.stop()
+
+    def test_should_cancel_outgoing_driver_if_worker_switches_first(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+        switched = threading.Event()
+
+        class OutgoingDriver(ScreenBufferTest.FakeDriver):
+            def cancel(self):
+                self.cancelled = switched.wait(5.0)
+
+        class IncomingDriver(ScreenBufferTest.FakeDriver):
+            cancelled = False
+
+            def prepare_query(self, start, desc, count):
+                switched.set()
+                return ScreenBufferTest.FakeDriver.prepare_query(self, start,
+                    desc, count)
+
+            def cancel(self):
+                self.cancelled = True
+
+        drv = OutgoingDriver(self.queue)
+        buf.start(drv)
+        self.queue.push(None)
+        self.queue.wait()
+
+        queue2 = ScreenBufferTest.Queue()
+        drv2 = IncomingDriver(queue2)
+        buf.restart(drv2)
+        queue2.push_backward_records(2, 2)
+        queue2.wait()
+
+        try:
+            self.assertTrue(drv.cancelled)
+            self.assertFalse(drv2.cancelled)
+            self.assertEqual(['1', '2'],
+                [x.message for x in buf.get_current_lines()])
+        finally:
+            buf.stop()
+
+    def test_should_not_cancel_driver_of_exited_worker(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=5)
+
+        class FailingDriver(ScreenBufferTest.FakeDriver):
+            cancelled = False
+
+            def start_connection(self):
+                raise RuntimeError('no such table: logs')
+
+            def cancel(self):
+                self.cancelled = True
+
+        drv = FailingDriver(self.queue)
+        with patch('threading.excepthook'):
+            buf.start(drv)
+            buf._thread.join()
+            buf.restart(FailingDriver(self.queue))
+            buf._thread.join()
+            buf.stop()
+
+        self.assertFalse(drv.cancelled)
+
     def test_should_stop_unstarted_driver(self):
         buf = ScreenBuffer(page_size=2, buffer_size=5)
 
@@ -584,6 +1197,116 @@ class ScreenBufferTest(unittest.TestCase):
         self.assertEqual('1', cur[0].message)
         self.assertEqual('2', cur[1].message)
 
+    def test_should_fetch_batch_of_records_from_driver(self):
+        drv = ScreenBufferTest.FakeDriver(self.queue)
+
+        self.queue.push_forward_records(1, 2)
+        self.assertEqual([1, 2], [x.id for x in drv.fetch_records(drv.magic, 5)])
+        self.queue.push_forward_records(3, 2)
+        self.assertEqual([3], [x.id for x in drv.fetch_records(drv.magic, 1)])
+        self.assertEqual([4], [x.id for x in drv.fetch_records(drv.magic, 5)])
+
+    def test_should_prefetch_background_records_a_page_at_a_time(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=6, low_buffer_threshold=4,
+            clock=lambda: 0.0)
+        drv = ScreenBufferTest.RangeDriver(1, 30)
+
+        buf.append_records(self._get_line(i) for i in range(11, 21))
+        buf.go_to_previous_page()
+        buf.go_to_previous_page()
+        buf.get_records(drv)
+
+        self.assertEqual([(20, False, 2), (22, False, 2), (24, False, 2),
+            (11, True, 2), (9, True, 2), (7, True, 2)], drv.queries)
+        self.assertEqual(22, buf.footprint[0])
+
+    def test_should_fetch_visible_records_in_one_go(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=6, low_buffer_threshold=4,
+            clock=lambda: 0.0)
+        drv = ScreenBufferTest.RangeDriver(1, 30)
+
+        buf.append_records(self._get_line(i) for i in range(11, 21))
+        buf.go_to_previous_page()
+        buf.go_to_previous_page()
+        buf.go_to_previous_page()
+        buf.go_to_previous_line()
+        buf.get_records(drv)
+
+        self.assertEqual([(11, True, 6)], drv.queries)
+        self.assertEqual(16, buf.footprint[0])
+
+    def test_should_give_up_prefetch_on_new_request(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=6, low_buffer_threshold=4,
+            clock=lambda: 0.0)
+
+        def on_query(n):
+            if n == 2:
+                buf.go_to_previous_line()
+        drv = ScreenBufferTest.RangeDriver(1, 30, on_query)
+
+        buf.append_records(self._get_line(i) for i in range(11, 21))
+        buf.go_to_previous_page()
+        buf.go_to_previous_page()
+
+        self.assertIsNone(buf.get_records(drv))
+        self.assertEqual([(20, False, 2), (22, False, 2)], drv.queries)
+        self.assertEqual(14, buf.footprint[0])
+
+    def test_should_show_scan_results_and_progress_as_they_arrive(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=4)
+        progress = []
+        drv = ScreenBufferTest.ScanDriver(100, {95, 60, 40, 20, 5}, 10,
+            lambda: progress.append((buf.footprint[0], buf.scan_progress)))
+        buf.add_observer(self.observer.notify)
+
+        buf.get_records(drv)
+
+        self.assertEqual([(0, None), (1, (10, 100)), (1, (20, 100)),
+            (1, (30, 100)), (1, (40, 100)), (2, (50, 100)), (2, (60, 100)),
+            (3, (70, 100)), (3, (80, 100))], progress)
+        self.assertIsNone(buf.scan_progress)
+        self.assertGreater(self.observer.count, len(progress))
+
+    def test_should_stop_scan_when_page_is_full(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=4)
+        drv = ScreenBufferTest.ScanDriver(100, {95, 60, 40, 20, 5}, 10)
+
+        self.assertEqual(0, buf.get_records(drv))
+
+        self.assertEqual(['60', '95'], [x.message for x in buf.get_current_lines()])
+        self.assertEqual(4, buf.footprint[0])
+        self.assertFalse(buf._bottom_seen)
+
+    def test_should_stop_scan_on_new_request(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=4)
+        fetches = []
+        drv = ScreenBufferTest.ScanDriver(100, {5}, 10,
+            lambda: fetches.append(buf._invalidate()))
+
+        self.assertEqual(0, buf.get_records(drv))
+
+        self.assertEqual(1, len(fetches))
+        self.assertEqual(0, buf.footprint[0])
+        self.assertIsNone(buf.scan_progress)
+
+    def test_should_scan_one_window_for_background_read_ahead(self):
+        buf = ScreenBuffer(page_size=2, buffer_size=4)
+        buf.append_records([self._get_line(i) for i in range(95, 101)])
+        buf.go_to_previous_line()
+        buf.go_to_previous_line()
+        fetches = []
+        drv = ScreenBufferTest.ScanDriver(100, {5}, 10,
+            lambda: fetches.append(None))
+
+        instructions = buf.get_buffer_instructions(drv)
+
+        self.assertEqual(0, buf.get_records(drv))
+
+        self.assertEqual([False, True], [x[1] for x in instructions])
+        self.assertEqual(2, len(fetches))
+        self.assertEqual(6, buf.footprint[0])
+        self.assertFalse(buf._bottom_seen)
+
     def test_should_fetch_records_in_descending_order(self):
         buf = ScreenBuffer(page_size=2, buffer_size=5)
 
@@ -645,7 +1368,7 @@ class ScreenBufferTest(unittest.TestCase):
         buf.go_to_previous_page()
         buf.go_to_previous_page()
 
-        self.queue.push_backward_records(7, 7)
+        self.queue.push_backward_records(7, 5)
         buf.get_records(drv)
 
         buf.go_to_previous_page()
@@ -670,7 +1393,7 @@ class ScreenBufferTest(unittest.TestCase):
         buf.go_to_previous_page()
         buf.go_to_previous_page()
 
-        self.queue.push_backward_records(7, 7)
+        self.queue.push_backward_records(7, 5)
         buf.get_records(drv)
 
         buf.go_to_previous_page()
@@ -735,3 +1458,35 @@ class ScreenBufferTest(unittest.TestCase):
 
             buf.stop()
             cond_wait.assert_called_once_with(13)
+
+class RecordBatchTest(unittest.TestCase):
+    def test_should_create_batch_from_records(self):
+        dt = datetime.datetime(2016, 5, 22, 23, 0, 0)
+        batch = ScreenBuffer.RecordBatch.from_records([
+            ScreenBuffer.Record(1, 1, 6, 'h1', dt, 'p1', '100', 'a'),
+            ScreenBuffer.Record(2, 2, 7, 'h2', dt, 'p1', '101', 'b'),
+            ScreenBuffer.Record(3, 3, 5, 'h1', dt, 'p2', '102', 'c')])
+
+        self.assertEqual(3, len(batch))
+        self.assertEqual([1, 2, 3], list(batch.ids))
+        self.assertEqual([1463958000] * 3, list(batch.timestamps))
+        self.assertEqual([1, 2, 3], list(batch.facilities))
+        self.assertEqual([6, 7, 5], list(batch.levels))
+        self.assertEqual(['h1', 'p1', 'h2', 'p2'], batch.strings)
+        self.assertEqual([0, 2, 0], list(batch.hosts))
+        self.assertEqual([1, 1, 3], list(batch.programs))
+        self.assertEqual(['100', '101', '102'], batch.pids)
+        self.assertEqual(['a', 'b', 'c'], batch.messages)
+
+    def test_should_get_record_from_batch(self):
+        rec = ScreenBuffer.Record(1, 1, 6, 'h1',
+            datetime.datetime(2016, 5, 22, 23, 0, 0), 'p1', '100', 'a')
+        batch = ScreenBuffer.RecordBatch.from_records([rec])
+
+        self.assertEqual(rec, batch.record(0))
+
+    def test_should_keep_missing_values_in_batch(self):
+        rec = ScreenBuffer.Record(1, None, None, None, None, None, None, 'a')
+        batch = ScreenBuffer.RecordBatch.from_records([rec])
+
+        self.assertEqual(rec, batch.record(0))
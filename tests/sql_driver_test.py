@@ -1,148 +1,211 @@
 import unittest
 import random
-import datetime
+from unittest.mock import patch
 
 from logviewer.sql_driver import SQLDriver
 
 class SQLDriverTest(unittest.TestCase):
     class FakeSQLDriver(SQLDriver):
+        STREAM_FACTOR = 1
+        SCAN_WINDOWS = False
+
         def __init__(self, **kwargs):
             SQLDriver.__init__(self, **kwargs)
             self.query = None
+            self.params = None
             self.magic = random.randint(1, 1000)
 
-        def select(self, query):
+        def select(self, query, params=()):
             self.query = query
+            self.params = params
             return self.magic
 
+        def fetch_rows(self, query, count):
+            if query != self.magic:
+                raise ValueError(query)
+            return []
+
     def test_should_execute_query_without_initial_id(self):
         drv = SQLDriverTest.FakeSQLDriver()
-        self.assertEqual(drv.magic, drv.prepare_query(None, True, 10))
+        drv.prepare_query(None, True, 10)
 
         self.assertEqual("SELECT id, facility_num, level_num, host, datetime, "\
-            "program, pid, message FROM logs ORDER BY id DESC LIMIT 10", drv.query)
+            "program, pid, message FROM logs ORDER BY id DESC LIMIT ?", drv.query)
+        self.assertEqual((10,), drv.params)
 
     def test_should_execute_query_with_different_limit(self):
         drv = SQLDriverTest.FakeSQLDriver()
-        self.assertEqual(drv.magic, drv.prepare_query(None, True, 1))
+        drv.prepare_query(None, True, 1)
 
         self.assertEqual("SELECT id, facility_num, level_num, host, datetime, "\
-            "program, pid, message FROM logs ORDER BY id DESC LIMIT 1", drv.query)
+            "program, pid, message FROM logs ORDER BY id DESC LIMIT ?", drv.query)
+        self.assertEqual((1,), drv.params)
 
     def test_should_execute_query_with_an_initial_id(self):
         drv = SQLDriverTest.FakeSQLDriver()
-        self.assertEqual(drv.magic, drv.prepare_query(100, True, 10))
+        drv.prepare_query(100, True, 10)
 
         self.assertEqual("SELECT id, facility_num, level_num, host, datetime, "\
-            "program, pid, message FROM logs WHERE id < 100 ORDER BY id DESC LIMIT 10",
+            "program, pid, message FROM logs WHERE id < ? ORDER BY id DESC LIMIT ?",
             drv.query)
+        self.assertEqual((100, 10), drv.params)
 
     def test_should_execute_query_in_ascending_order(self):
         drv = SQLDriverTest.FakeSQLDriver()
-        self.assertEqual(drv.magic, drv.prepare_query(100, False, 10))
+        drv.prepare_query(100, False, 10)
 
         self.assertEqual("SELECT id, facility_num, level_num, host, datetime, "\
-            "program, pid, message FROM logs WHERE id > 100 ORDER BY id ASC LIMIT 10",
+            "program, pid, message FROM logs WHERE id > ? ORDER BY id ASC LIMIT ?",
             drv.query)
+        self.assertEqual((100, 10), drv.params)
 
     def test_should_execute_query_with_level_filter(self):
         drv = SQLDriverTest.FakeSQLDriver(level=3)
-        self.assertEqual(drv.magic, drv.prepare_query(100, True, 10))
+        drv.prepare_query(100, True, 10)
 
         self.assertEqual("SELECT id, facility_num, level_num, host, datetime, "\
-            "program, pid, message FROM logs WHERE id < 100 AND level_num <= 3 "\
-            "ORDER BY id DESC LIMIT 10", drv.query)
+            "program, pid, message FROM logs WHERE id < ? AND level_num <= ? "\
+            "ORDER BY id DESC LIMIT ?", drv.query)
+        self.assertEqual((100, 3, 10), drv.params)
 
     def test_should_execute_query_with_facility_filter(self):
         drv = SQLDriverTest.FakeSQLDriver(facility=5)
-        self.assertEqual(drv.magic, drv.prepare_query(100, True, 10))
+        drv.prepare_query(100, True, 10)
 
         self.assertEqual("SELECT id, facility_num, level_num, host, datetime, "\
-            "program, pid, message FROM logs WHERE id < 100 AND facility_num = 5 "\
-            "ORDER BY id DESC LIMIT 10", drv.query)
+            "program, pid, message FROM logs WHERE id < ? AND facility_num = ? "\
+            "ORDER BY id DESC LIMIT ?", drv.query)
+        self.assertEqual((100, 5, 10), drv.params)
 
     def test_should_filter_query_by_one_program(self):
         drv = SQLDriverTest.FakeSQLDriver(program='sshd')
         drv.prepare_query(100, True, 10)
 
         self.assertEqual("SELECT id, facility_num, level_num, host, datetime, "\
-            "program, pid, message FROM logs WHERE id < 100 AND "\
-            "(program = 'sshd') ORDER BY id DESC LIMIT 10", drv.query)
+            "program, pid, message FROM logs WHERE id < ? AND "\
+            "(program = ?) ORDER BY id DESC LIMIT ?", drv.query)
+        self.assertEqual((100, 'sshd', 10), drv.params)
 
     def test_should_filter_query_by_multiple_programs(self):
         drv = SQLDriverTest.FakeSQLDriver(program='sshd sudo')
         drv.prepare_query(100, True, 10)
 
         self.assertEqual("SELECT id, facility_num, level_num, host, datetime, "\
-            "program, pid, message FROM logs WHERE id < 100 AND "\
-            "(program = 'sshd' OR program = 'sudo') ORDER BY id DESC LIMIT 10",
-            drv.query)
+            "program, pid, message FROM logs WHERE id < ? AND "\
+            "(program = ? OR program = ?) ORDER BY id DESC LIMIT ?", drv.query)
+        self.assertEqual((100, 'sshd', 'sudo', 10), drv.params)
 
     def test_should_filter_by_program_stripping_extra_spaces(self):
         drv = SQLDriverTest.FakeSQLDriver(program=' sshd  sudo ')
         drv.prepare_query(100, True, 10)
 
         self.assertEqual("SELECT id, facility_num, level_num, host, datetime, "\
-            "program, pid, message FROM logs WHERE id < 100 AND "\
-            "(program = 'sshd' OR program = 'sudo') ORDER BY id DESC LIMIT 10",
-            drv.query)
+            "program, pid, message FROM logs WHERE id < ? AND "\
+            "(program = ? OR program = ?) ORDER BY id DESC LIMIT ?", drv.query)
+        self.assertEqual((100, 'sshd', 'sudo', 10), drv.params)
 
     def test_should_filter_program_with_wildcard(self):
         drv = SQLDriverTest.FakeSQLDriver(program='s*')
         drv.prepare_query(100, True, 10)
 
         self.assertEqual("SELECT id, facility_num, level_num, host, datetime, "\
-            "program, pid, message FROM logs WHERE id < 100 AND "\
-            "(program LIKE 's%') ORDER BY id DESC LIMIT 10", drv.query)
+            "program, pid, message FROM logs WHERE id < ? AND "\
+            "(program LIKE ?) ORDER BY id DESC LIMIT ?", drv.query)
+        self.assertEqual((100, 's%', 10), drv.params)
 
     def test_should_filter_program_with_negative_condition(self):
         drv = SQLDriverTest.FakeSQLDriver(program='!sshd')
         drv.prepare_query(100, True, 10)
 
         self.assertEqual("SELECT id, facility_num, level_num, host, datetime, "\
-            "program, pid, message FROM logs WHERE id < 100 AND "\
-            "program <> 'sshd' ORDER BY id DESC LIMIT 10", drv.query)
+            "program, pid, message FROM logs WHERE id < ? AND "\
+            "program <> ? ORDER BY id DESC LIMIT ?", drv.query)
+        self.assertEqual((100, 'sshd', 10), drv.params)
 
     def test_should_filter_program_with_negative_wildcard_condition(self):
         drv = SQLDriverTest.FakeSQLDriver(program='!s*')
         drv.prepare_query(100, True, 10)
 
         self.assertEqual("SELECT id, facility_num, level_num, host, datetime, "\
-            "program, pid, message FROM logs WHERE id < 100 AND "\
-            "program NOT LIKE 's%' ORDER BY id DESC LIMIT 10", drv.query)
+            "program, pid, message FROM logs WHERE id < ? AND "\
+            "program NOT LIKE ? ORDER BY id DESC LIMIT ?", drv.query)
+        self.assertEqual((100, 's%', 10), drv.params)
 
     def test_should_filter_program_with_multiple_negative_conditions(self):
         drv = SQLDriverTest.FakeSQLDriver(program='!sshd !sudo')
         drv.prepare_query(100, True, 10)
 
         self.assertEqual("SELECT id, facility_num, level_num, host, datetime, "\
-            "program, pid, message FROM logs WHERE id < 100 AND "\
-            "program <> 'sshd' AND program <> 'sudo' ORDER BY id DESC LIMIT 10",
-            drv.query)
+            "program, pid, message FROM logs WHERE id < ? AND "\
+            "program <> ? AND program <> ? ORDER BY id DESC LIMIT ?", drv.query)
+        self.assertEqual((100, 'sshd', 'sudo', 10), drv.params)
 
     def test_should_filter_program_with_positive_and_negative_conditions(self):
         drv = SQLDriverTest.FakeSQLDriver(program='!sshd s*')
         drv.prepare_query(100, True, 10)
 
         self.assertEqual("SELECT id, facility_num, level_num, host, datetime, "\
-            "program, pid, message FROM logs WHERE id < 100 AND "\
-            "(program LIKE 's%') AND program <> 'sshd' ORDER BY id DESC LIMIT 10",
-            drv.query)
+            "program, pid, message FROM logs WHERE id < ? AND "\
+            "(program LIKE ?) AND program <> ? ORDER BY id DESC LIMIT ?", drv.query)
+        self.assertEqual((100, 's%', 'sshd', 10), drv.params)
 
     def test_should_filter_host_with_multiple_conditions(self):
         drv = SQLDriverTest.FakeSQLDriver(host='h1 h2')
         drv.prepare_query(100, True, 10)
 
         self.assertEqual("SELECT id, facility_num, level_num, host, datetime, "\
-            "program, pid, message FROM logs WHERE id < 100 AND "\
-            "(host = 'h1' OR host = 'h2') ORDER BY id DESC LIMIT 10",
-            drv.query)
+            "program, pid, message FROM logs WHERE id < ? AND "\
+            "(host = ? OR host = ?) ORDER BY id DESC LIMIT ?", drv.query)
+        self.assertEqual((100, 'h1', 'h2', 10), drv.params)
 
-    def test_should_find_date(self):
-        drv = SQLDriverTest.FakeSQLDriver(
-            start_date=datetime.datetime(2016, 6, 27, 22, 27, 50))
-        drv.prepare_datetime_query()
+    def test_should_ignore_empty_filter(self):
+        drv = SQLDriverTest.FakeSQLDriver(program=' ')
+        drv.prepare_query(100, True, 10)
 
         self.assertEqual("SELECT id, facility_num, level_num, host, datetime, "\
-            "program, pid, message FROM logs WHERE datetime >= "\
-            "'2016-06-27 22:27:50' ORDER BY datetime ASC LIMIT 1", drv.query)
+            "program, pid, message FROM logs WHERE id < ? ORDER BY id DESC "\
+            "LIMIT ?", drv.query)
+
+    def test_should_reuse_statement_text(self):
+        drv = SQLDriverTest.FakeSQLDriver(host='h1 !h2*', level=3)
+        drv.prepare_query(100, True, 10)
+        query = drv.query
+
+        with patch.object(drv, '_build_one_filter', side_effect=AssertionError):
+            drv.prepare_query(50, True, 10)
+        self.assertIs(query, drv.query)
+        self.assertEqual((50, 3, 'h1', 'h2%', 10), drv.params)
+
+    def test_should_list_statements_for_filter(self):
+        drv = SQLDriverTest.FakeSQLDriver(facility=4)
+        statements = drv.get_statements()
+
+        self.assertEqual(4, len(statements))
+        self.assertIn(("SELECT id, facility_num, level_num, host, datetime, "\
+            "program, pid, message FROM logs WHERE id < ? AND facility_num = ? "\
+            "ORDER BY id DESC LIMIT ?", (1, 4, 1)), statements)
+        self.assertIn(("SELECT id, facility_num, level_num, host, datetime, "\
+            "program, pid, message FROM logs WHERE facility_num = ? "\
+            "ORDER BY id DESC LIMIT ?", (4, 1)), statements)
+
+    def test_should_filter_by_ids_from_dictionaries(self):
+        drv = SQLDriverTest.FakeSQLDriver(host='web* !db1 Mail', program='cron')
+        drv.use_dictionaries({ 1: 'web1', 2: 'WEB2', 3: 'db1', 4: 'mail',
+            5: 'Mail' }, { 1: 'cron', 2: 'sshd' })
+        drv.prepare_query(100, True, 10)
+
+        self.assertEqual("SELECT id, facility_num, level_num, host_id, "\
+            "datetime, program_id, pid, message FROM logs WHERE id < ? AND "\
+            "host_id IN (?, ?, ?) AND host_id NOT IN (?) AND "\
+            "program_id IN (?) ORDER BY id DESC LIMIT ?", drv.query)
+        self.assertEqual((100, 1, 2, 5, 3, 1, 10), drv.params)
+
+    def test_should_match_nothing_if_no_name_matches(self):
+        drv = SQLDriverTest.FakeSQLDriver(program='cron* !sshd')
+        drv.use_dictionaries({}, { 1: 'sudo' })
+        drv.prepare_query(100, True, 10)
+
+        self.assertEqual("SELECT id, facility_num, level_num, host_id, "\
+            "datetime, program_id, pid, message FROM logs WHERE id < ? AND "\
+            "program_id IN (NULL) ORDER BY id DESC LIMIT ?", drv.query)
+        self.assertEqual((100, 10), drv.params)
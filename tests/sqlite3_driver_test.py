@@ -0,0 +1,411 @@
+import unittest
+import tempfile
+import os.path
+import sqlite3
+import datetime
+import threading
+
+from logviewer.screen_buffer import ScreenBuffer
+from logviewer.sqlite3_driver import SQLite3Driver
+from logviewer import window_states
+from logviewer import sqlite3_schema
+
+class SQLite3DriverTest(unittest.TestCase):
+    class CountingDriver(SQLite3Driver):
+        def __init__(self, filename, **kwargs):
+            SQLite3Driver.__init__(self, filename, **kwargs)
+            self.queries = 0
+
+        def select(self, cmd, params=()):
+            self.queries += 1
+            return SQLite3Driver.select(self, cmd, params)
+
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._filename = os.path.join(self._temp_dir.name, 'test.db')
+
+        conn = sqlite3.connect(self._filename)
+        conn.execute('CREATE TABLE logs (id INTEGER PRIMARY KEY '\
+            'AUTOINCREMENT, facility_num INTEGER, level_num INTEGER, '\
+            'host TEXT, datetime TEXT, program TEXT, pid TEXT, message TEXT)')
+        for i in range(1, 6):
+            conn.execute("INSERT INTO logs (facility_num, level_num, host, "\
+                "datetime, program, pid, message) VALUES ('1', '6', 'oasis', "\
+                "'2016-05-22 23:00:0{}', 'test', '100', 'line {}')".format(i, i))
+        conn.commit()
+        conn.close()
+
+        self._driver = SQLite3DriverTest.CountingDriver(self._filename)
+        self._driver.start_connection()
+
+    def tearDown(self):
+        self._driver.stop_connection()
+        self._temp_dir.cleanup()
+
+    def test_should_fetch_typed_record(self):
+        query = self._driver.prepare_query(None, True, 1)
+        rec = self._driver.fetch_record(query)
+
+        self.assertEqual(ScreenBuffer.Record(5, 1, 6, 'oasis',
+            datetime.datetime(2016, 5, 22, 23, 0, 5), 'test', '100', 'line 5'),
+            rec)
+        self.assertIsNone(self._driver.fetch_record(query))
+
+    def test_should_intern_host_and_program(self):
+        query = self._driver.prepare_query(None, True, 2)
+        rec1 = self._driver.fetch_record(query)
+        rec2 = self._driver.fetch_record(query)
+
+        self.assertIs(rec1.host, rec2.host)
+        self.assertIs(rec1.program, rec2.program)
+
+    def test_should_fetch_records_in_batches(self):
+        query = self._driver.prepare_query(None, False, 10)
+
+        self.assertEqual([1, 2, 3],
+            [x.id for x in self._driver.fetch_records(query, 3)])
+        self.assertEqual([4, 5],
+            [x.id for x in self._driver.fetch_records(query, 3)])
+        self.assertEqual([], self._driver.fetch_records(query, 3))
+
+    def test_should_fetch_columnar_batch(self):
+        query = self._driver.prepare_query(None, True, 2)
+        batch = self._driver.fetch_batch(query, 10)
+
+        self.assertEqual([5, 4], list(batch.ids))
+        self.assertEqual(['oasis', 'test'], batch.strings)
+        self.assertEqual(ScreenBuffer.Record(4, 1, 6, 'oasis',
+            datetime.datetime(2016, 5, 22, 23, 0, 4), 'test', '100', 'line 4'),
+            batch.record(1))
+
+    def test_should_take_connection_to_same_database(self):
+        driver = SQLite3DriverTest.CountingDriver(self._filename,
+            program='test')
+
+        self.assertTrue(driver.take_connection(self._driver))
+        self._driver = driver
+        query = driver.prepare_query(None, True, 1)
+        self.assertEqual(5, driver.fetch_record(query).id)
+
+    def test_should_not_take_connection_to_other_database(self):
+        driver = SQLite3Driver(os.path.join(self._temp_dir.name, 'other.db'))
+
+        self.assertFalse(driver.take_connection(self._driver))
+        self.assertFalse(driver.take_connection(ScreenBuffer.Driver()))
+
+    def test_should_cancel_running_query(self):
+        timer = threading.Timer(0.05, self._driver.cancel)
+        timer.start()
+        try:
+            self.assertRaises(ScreenBuffer.Cancelled, self._driver.select,
+                'WITH RECURSIVE c(x) AS (SELECT 1 UNION ALL SELECT x + 1 '\
+                'FROM c) SELECT MAX(x) FROM c')
+        finally:
+            timer.join()
+
+        query = self._driver.prepare_query(None, True, 1)
+        self.assertEqual(5, self._driver.fetch_record(query).id)
+
+    def test_should_ignore_cancel_after_connection_stopped(self):
+        self._driver.stop_connection()
+        self._driver.cancel()
+
+        self._driver.start_connection()
+
+    def _fetch_ids(self, start, desc, count):
+        query = self._driver.prepare_query(start, desc, count)
+        return list(self._driver.fetch_batch(query, count).ids)
+
+    def test_should_continue_stream_without_new_query(self):
+        self._driver.STREAM_FACTOR = 4
+        self.assertEqual([5, 4], self._fetch_ids(None, True, 2))
+        self.assertEqual([3, 2], self._fetch_ids(4, True, 2))
+        self.assertEqual([1], self._fetch_ids(2, True, 2))
+        self.assertEqual(1, self._driver.queries)
+
+    def test_should_read_next_block_when_stream_runs_out(self):
+        self.assertEqual([1], self._fetch_ids(0, False, 1))
+        self.assertEqual([2, 3, 4, 5], self._fetch_ids(1, False, 4))
+        self.assertEqual(2, self._driver.queries)
+
+    def test_should_requery_if_start_moves(self):
+        self.assertEqual([5, 4], self._fetch_ids(None, True, 2))
+        self.assertEqual([2, 1], self._fetch_ids(3, True, 2))
+        self.assertEqual(2, self._driver.queries)
+
+    def test_should_keep_separate_streams_per_direction(self):
+        self._driver.STREAM_FACTOR = 4
+        self.assertEqual([3, 2], self._fetch_ids(4, True, 2))
+        self.assertEqual([5], self._fetch_ids(4, False, 2))
+        self.assertEqual([1], self._fetch_ids(2, True, 2))
+        self.assertEqual(2, self._driver.queries)
+
+    def test_should_requery_exhausted_stream_for_new_rows(self):
+        self.assertEqual([4, 5], self._fetch_ids(3, False, 5))
+
+        conn = sqlite3.connect(self._filename)
+        conn.execute("INSERT INTO logs (facility_num, level_num, host, "\
+            "datetime, program, pid, message) VALUES ('1', '6', 'oasis', "\
+            "'2016-05-22 23:00:06', 'test', '100', 'line 6')")
+        conn.commit()
+        conn.close()
+
+        self.assertEqual([6], self._fetch_ids(5, False, 5))
+        self.assertEqual(2, self._driver.queries)
+
+    def test_should_pass_quotes_in_filter_as_values(self):
+        conn = sqlite3.connect(self._filename)
+        conn.execute("INSERT INTO logs (facility_num, level_num, host, "\
+            "datetime, program, pid, message) VALUES ('1', '6', 'o''hara', "\
+            "'2016-05-22 23:00:06', 'test', '100', 'line 6')")
+        conn.commit()
+        conn.close()
+
+        self._driver.stop_connection()
+        self._driver = SQLite3DriverTest.CountingDriver(self._filename,
+            host="o'hara o'h*")
+        self._driver.start_connection()
+        self.assertEqual([6], self._fetch_ids(None, True, 5))
+
+    def _seek(self, second):
+        self._driver.stop_connection()
+        self._driver = SQLite3DriverTest.CountingDriver(self._filename,
+            start_date=datetime.datetime(2016, 5, 22, 23, 0, second))
+        self._driver.start_connection()
+        return self._driver.seek_start_date()
+
+    def test_should_seek_start_date(self):
+        self.assertEqual(3, self._seek(3))
+        self.assertEqual(1, self._seek(0))
+        self.assertIsNone(self._seek(6))
+
+    def test_should_seek_start_date_across_id_gaps(self):
+        conn = sqlite3.connect(self._filename)
+        conn.execute("DELETE FROM logs WHERE id IN (2, 3)")
+        conn.commit()
+        conn.close()
+
+        self.assertEqual(4, self._seek(2))
+        self.assertEqual(1, self._seek(1))
+
+    def test_should_seek_start_date_with_point_lookups(self):
+        self.assertEqual(5, self._seek(5))
+        self.assertLessEqual(self._driver.queries, 5)
+
+    def test_should_seek_in_empty_table(self):
+        conn = sqlite3.connect(self._filename)
+        conn.execute("DELETE FROM logs")
+        conn.commit()
+        conn.close()
+
+        self.assertIsNone(self._seek(1))
+
+    def _set_program(self, ids, program):
+        conn = sqlite3.connect(self._filename)
+        conn.executemany("UPDATE logs SET program = ? WHERE id = ?",
+            ((program, i) for i in ids))
+        conn.commit()
+        conn.close()
+
+    def _start_driver(self, **kwargs):
+        self._driver.stop_connection()
+        self._driver = SQLite3DriverTest.CountingDriver(self._filename, **kwargs)
+        self._driver.start_connection()
+
+    def test_should_scan_filtered_rows_in_id_windows(self):
+        self._set_program([1], 'rare')
+        self._start_driver(program='rare')
+        self._driver.STREAM_FACTOR = 1
+
+        query = self._driver.prepare_query(None, True, 1)
+        self.assertEqual((1, 5), self._driver.get_scan_progress(query))
+        self.assertEqual([], list(self._driver.fetch_batch(query, 1).ids))
+        self.assertEqual((3, 5), self._driver.get_scan_progress(query))
+        self.assertEqual([1], list(self._driver.fetch_batch(query, 1).ids))
+        self.assertIsNone(self._driver.get_scan_progress(query))
+        self.assertEqual(4, self._driver.queries)
+
+    def test_should_not_scan_in_windows_with_index_for_filter(self):
+        self._set_program([1], 'rare')
+        conn = sqlite3.connect(self._filename)
+        conn.execute('CREATE INDEX logs_program ON logs (program)')
+        conn.close()
+        self._start_driver(program='rare')
+
+        query = self._driver.prepare_query(None, True, 1)
+        self.assertIsNone(self._driver.get_scan_progress(query))
+        self.assertEqual([1], list(self._driver.fetch_batch(query, 1).ids))
+        self.assertEqual(1, self._driver.queries)
+
+    def test_should_read_all_windows_when_fetching_records(self):
+        self._set_program([2, 4], 'rare')
+        self._start_driver(program='rare')
+        self._driver.STREAM_FACTOR = 1
+
+        query = self._driver.prepare_query(1, False, 2)
+        self.assertEqual([2, 4],
+            [x.id for x in self._driver.fetch_records(query, 2)])
+
+    def test_should_end_scan_at_first_id(self):
+        self._start_driver(program='test')
+
+        query = self._driver.prepare_query(3, True, 5)
+        self.assertEqual([2, 1], list(self._driver.fetch_batch(query, 5).ids))
+        self.assertIsNone(self._driver.get_scan_progress(query))
+        self.assertEqual([4, 5], self._fetch_ids(3, False, 5))
+
+    def test_should_open_read_only_connection(self):
+        self.assertRaises(sqlite3.OperationalError, self._driver.select,
+            "DELETE FROM logs")
+        self.assertEqual([5], self._fetch_ids(None, True, 1))
+
+    def test_should_set_connection_pragmas(self):
+        factory = SQLite3Driver.Factory(self._filename, mmap_size='0',
+            cache_size='-512', temp_store='file', query_only='no')
+        self._driver.stop_connection()
+        self._driver = factory.create_driver(window_states.Filter())
+        self._driver.start_connection()
+
+        self.assertEqual([(-512, )],
+            self._driver.select('PRAGMA cache_size').fetchall())
+        self.assertEqual([(1, )],
+            self._driver.select('PRAGMA temp_store').fetchall())
+        self.assertEqual([(0, )],
+            self._driver.select('PRAGMA query_only').fetchall())
+
+    def test_should_use_default_pragmas(self):
+        self.assertEqual([(2, )],
+            self._driver.select('PRAGMA temp_store').fetchall())
+        self.assertEqual([(1, )],
+            self._driver.select('PRAGMA query_only').fetchall())
+
+    def test_should_reject_invalid_temp_store(self):
+        self.assertRaises(ValueError, SQLite3Driver.Factory, self._filename,
+            temp_store='ram')
+
+    def test_should_detect_journal_mode(self):
+        self.assertEqual('delete', self._driver.journal_mode)
+        self.assertFalse(self._driver.is_wal)
+
+        conn = sqlite3.connect(self._filename)
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.close()
+
+        self._start_driver()
+        self.assertTrue(self._driver.is_wal)
+        self.assertEqual([5], self._fetch_ids(None, True, 1))
+
+    def test_should_not_take_connection_with_other_pragmas(self):
+        driver = SQLite3Driver(self._filename, pragmas={ 'query_only': 0 })
+
+        self.assertFalse(driver.take_connection(self._driver))
+
+    def _create_epoch_database(self, timestamps):
+        filename = os.path.join(self._temp_dir.name, 'epoch.db')
+        conn = sqlite3.connect(filename)
+        conn.execute('CREATE TABLE logs (id INTEGER PRIMARY KEY '\
+            'AUTOINCREMENT, facility_num INTEGER, level_num INTEGER, '\
+            'host TEXT, datetime INTEGER, program TEXT, pid TEXT, message TEXT)')
+        conn.executemany("INSERT INTO logs (facility_num, level_num, host, "\
+            "datetime, program, pid, message) VALUES (1, 6, 'oasis', ?, "\
+            "'test', '100', 'line')", ((x, ) for x in timestamps))
+        conn.commit()
+        conn.close()
+        return filename
+
+    def test_should_read_epoch_timestamps_in_local_time(self):
+        timestamps = [1464000000, 1464000001, 1478000000]
+        self._driver.stop_connection()
+        self._driver = SQLite3Driver(self._create_epoch_database(timestamps))
+        self._driver.start_connection()
+
+        query = self._driver.prepare_query(None, False, 3)
+        self.assertEqual([datetime.datetime.fromtimestamp(x) for x in timestamps],
+            [x.datetime for x in self._driver.fetch_records(query, 3)])
+
+    def test_should_seek_start_date_in_epoch_database(self):
+        self._driver.stop_connection()
+        self._driver = SQLite3Driver(self._create_epoch_database(
+            [1464000000 + 60 * i for i in range(10)]),
+            start_date=datetime.datetime.fromtimestamp(1464000000 + 270))
+        self._driver.start_connection()
+
+        self.assertEqual(6, self._driver.seek_start_date())
+
+    def test_should_parse_text_timestamps_without_strptime(self):
+        for value in ['2016-05-22 23:00:01', '1999-12-31 23:59:59',
+                '2016-02-29 00:00:00', '1970-01-01 00:00:00']:
+            self.assertEqual(datetime.datetime.strptime(value,
+                '%Y-%m-%d %H:%M:%S'), self._driver._parse_datetime(value))
+        self.assertIsNone(self._driver._parse_datetime(None))
+
+    def _migrate(self):
+        filename = os.path.join(self._temp_dir.name, 'v2.db')
+        sqlite3_schema.migrate_to_v2(self._filename, filename)
+        return filename
+
+    def test_should_read_migrated_database(self):
+        self._set_program([2], 'cron')
+        query = self._driver.prepare_query(None, True, 5)
+        expected = self._driver.fetch_records(query, 5)
+
+        self._driver.stop_connection()
+        self._driver = SQLite3Driver(self._migrate())
+        self._driver.start_connection()
+
+        query = self._driver.prepare_query(None, True, 5)
+        self.assertEqual(expected, self._driver.fetch_records(query, 5))
+
+    def test_should_filter_migrated_database_by_ids(self):
+        self._set_program([2, 4], 'cron')
+        self._driver.stop_connection()
+        self._driver = SQLite3DriverTest.CountingDriver(self._migrate(),
+            program='cr* !test')
+        self._driver.start_connection()
+
+        self.assertEqual([4, 2], self._fetch_ids(None, True, 5))
+
+    def test_should_match_prefix_like_unmigrated_database(self):
+        self._set_program([2], 'sys-d')
+        self._set_program([4], 'SYS_d')
+        self._start_driver(program='sys_* !test')
+        expected = self._fetch_ids(None, True, 5)
+
+        self._driver.stop_connection()
+        self._driver = SQLite3DriverTest.CountingDriver(self._migrate(),
+            program='sys_* !test')
+        self._driver.start_connection()
+
+        self.assertEqual([4, 2], expected)
+        self.assertEqual(expected, self._fetch_ids(None, True, 5))
+
+    def test_should_load_new_names_when_filtering_new_rows(self):
+        filename = self._migrate()
+        self._driver.stop_connection()
+        self._driver = SQLite3DriverTest.CountingDriver(filename, host='web*')
+        self._driver.start_connection()
+        self.assertEqual([], self._fetch_ids(None, True, 5))
+
+        conn = sqlite3.connect(filename)
+        conn.execute("INSERT INTO hosts (name) VALUES ('web1')")
+        conn.execute("INSERT INTO logs (facility_num, level_num, host_id, "\
+            "datetime, program_id, pid, message) VALUES (1, 6, "\
+            "(SELECT id FROM hosts WHERE name = 'web1'), 1464000000, 1, "\
+            "'100', 'line 6')")
+        conn.commit()
+        conn.close()
+
+        query = self._driver.prepare_query(5, False, 5)
+        self.assertEqual([('web1', 'test')], [(x.host, x.program)
+            for x in self._driver.fetch_records(query, 5)])
+
+    def test_should_keep_dictionaries_when_taking_connection(self):
+        filename = self._migrate()
+        self._driver.stop_connection()
+        self._driver = SQLite3Driver(filename)
+        self._driver.start_connection()
+
+        driver = SQLite3Driver(filename, host='oasis')
+        self.assertTrue(driver.take_connection(self._driver))
+        self._driver = driver
+        self.assertEqual([5, 4], self._fetch_ids(None, True, 2))
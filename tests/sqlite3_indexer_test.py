@@ -0,0 +1,72 @@
+import unittest
+import tempfile
+import os.path
+import sqlite3
+
+from logviewer.sqlite3_indexer import SQLite3Indexer
+from logviewer import sqlite3_schema
+
+class SQLite3IndexerTest(unittest.TestCase):
+    def setUp(self):
+        self._temp_dir = tempfile.TemporaryDirectory()
+        self._filename = os.path.join(self._temp_dir.name, 'test.db')
+
+        conn = sqlite3.connect(self._filename)
+        conn.execute('CREATE TABLE logs (id INTEGER PRIMARY KEY '\
+            'AUTOINCREMENT, facility_num INTEGER, level_num INTEGER, '\
+            'host TEXT, datetime TEXT, program TEXT, pid TEXT, message TEXT)')
+        conn.executemany("INSERT INTO logs (facility_num, level_num, host, "\
+            "datetime, program, pid, message) VALUES (?, ?, ?, "\
+            "'2016-05-22 23:00:00', ?, '100', 'line')",
+            ((i % 24, i % 8, 'host{}'.format(i % 50), 'program{}'.format(i % 20))
+                for i in range(2000)))
+        conn.commit()
+        conn.close()
+
+        self._indexer = SQLite3Indexer(self._filename)
+
+    def tearDown(self):
+        self._temp_dir.cleanup()
+
+    def _get_plan(self, plans, filter):
+        return [x for x in plans if x.filter == filter][0]
+
+    def test_should_create_indexes_once(self):
+        self.assertEqual(['logs_facility_num', 'logs_host', 'logs_program'],
+            self._indexer.create_indexes())
+        self.assertEqual([], self._indexer.create_indexes())
+
+    def test_should_report_scans_without_indexes(self):
+        plans = self._indexer.check_query_plans()
+
+        self.assertTrue(all(x.scans for x in plans))
+        self.assertEqual('facility=1: scan',
+            str(self._get_plan(plans, [('facility', 1)])))
+
+    def test_should_use_indexes_for_equality_filters(self):
+        self._indexer.create_indexes()
+        plans = self._indexer.check_query_plans()
+
+        plan = self._get_plan(plans, [('host', 'oasis')])
+        self.assertFalse(plan.scans)
+        self.assertEqual('host=oasis: logs_host', str(plan))
+        self.assertFalse(self._get_plan(plans,
+            [('level', 6), ('program', 'test')]).scans)
+
+    def test_should_report_remaining_scans(self):
+        self._indexer.create_indexes()
+        plans = self._indexer.check_query_plans()
+
+        self.assertTrue(self._get_plan(plans, [('level', 6)]).scans)
+        self.assertTrue(self._get_plan(plans, [('host', '!oasis')]).scans)
+
+    def test_should_index_ids_in_v2_database(self):
+        filename = os.path.join(self._temp_dir.name, 'v2.db')
+        sqlite3_schema.migrate_to_v2(self._filename, filename)
+        indexer = SQLite3Indexer(filename)
+
+        self.assertEqual(['logs_facility_num', 'logs_host_id', 'logs_program_id'],
+            indexer.create_indexes())
+        plans = indexer.check_query_plans()
+        self.assertEqual('host=oasis*: logs_host_id',
+            str(self._get_plan(plans, [('host', 'oasis*')])))
@@ -28,13 +28,13 @@ class BaseTest(unittest.TestCase):
 class LogTest(BaseTest):
     class FakeBuffer(object):
         def __init__(self, lines):
+            self.version = 0
+            self.scan_progress = None
             self._lines = []
             dt = datetime.datetime(2016, 6, 4)
             for i, (line, is_continuation) in enumerate(lines):
-                data = { 'id': i + 1, 'datetime': dt, 'host': 'test',
-                    'program': 'example', 'facility_num': 0, 'level_num': 7,
-                    'message': 'test message' }
-                data.update(line)
+                data = ScreenBuffer.Record(i + 1, 0, 7, 'test', dt, 'example',
+                    '100', 'test message')._replace(**line)
                 self._lines.append(ScreenBuffer.Line(data, is_continuation))
 
         def get_current_lines(self):
@@ -118,6 +118,17 @@ class LogTest(BaseTest):
         self._parent_window.chgat.assert_called_once_with(9, 0, 30, 0x300)
         self._parent_window.noutrefresh.assert_called_once_with()
 
+    def test_should_draw_scan_progress(self):
+        self._parent_window.getmaxyx.return_value = (10, 30)
+        buf = LogTest.FakeBuffer([])
+        buf.scan_progress = (2500, 10000)
+        win = Log(self._manager, buf, 100)
+
+        win.refresh()
+        self._parent_window.addnstr.assert_called_once_with(9, 0, ' scanning: '\
+            '2500 of 10000 ids (25%)  [l]evel: debug  [f]acility: ALL  '\
+            '[p]rogram: *  [h]ost: *  Go to [d]ate', 29)
+
     def test_should_draw_continuation_line(self):
         buf = LogTest.FakeBuffer([({}, False), ({}, True)])
 
@@ -159,6 +170,52 @@ class LogTest(BaseTest):
         win.refresh()
         self._pad.noutrefresh.assert_called_once_with(0, 4, 0, 0, 8, 29)
 
+    def test_should_reuse_formatted_prefix_from_previous_frame(self):
+        buf = LogTest.FakeBuffer([({}, False)])
+
+        self._parent_window.getmaxyx.return_value = (10, 30)
+        win = Log(self._manager, buf, 100)
+
+        win.refresh()
+        win._prefix_cache[1] = ('cached', 'h', 'p', 'F', 'L', 0)
+        self._pad.addnstr.reset_mock()
+        win.refresh()
+        self.assertEqual(((0, 0, 'cached', 14, 0),),
+            self._pad.addnstr.call_args_list[0])
+
+    def test_should_drop_formatted_prefixes_of_lines_out_of_screen(self):
+        buf = LogTest.FakeBuffer([({}, False), ({}, False)])
+
+        self._parent_window.getmaxyx.return_value = (10, 30)
+        win = Log(self._manager, buf, 100)
+
+        win.refresh()
+        self.assertEqual({1, 2}, set(win._prefix_cache))
+        del buf._lines[0]
+        win.refresh()
+        self.assertEqual({2}, set(win._prefix_cache))
+
+    def test_should_be_dirty_until_refreshed(self):
+        self._parent_window.getmaxyx.return_value = (10, 30)
+        win = Log(self._manager, LogTest.FakeBuffer([]), 100)
+
+        self.assertTrue(win.dirty)
+        win.refresh()
+        win.mark_clean()
+        self.assertFalse(win.dirty)
+        win.mark_dirty()
+        self.assertTrue(win.dirty)
+
+    def test_should_be_dirty_if_buffer_changes(self):
+        buf = LogTest.FakeBuffer([])
+        self._parent_window.getmaxyx.return_value = (10, 30)
+        win = Log(self._manager, buf, 100)
+
+        win.refresh()
+        win.mark_clean()
+        buf.version += 1
+        self.assertTrue(win.dirty)
+
     def test_should_draw_alert_line(self):
         buf = LogTest.FakeBuffer([({ 'level_num': 1 }, True)])
 